@@ -25,12 +25,15 @@ This program displays a paste icon in the system tray. The tray icon can
 be clicked and new pastes to online pastebins can be easily made.
 """
 
+# The time is taken before anything else for --profile-startup.
+import time
+_import_start = time.perf_counter()
 
-import gettext
-import locale
+import gettext      # NOQA
+import locale       # NOQA
 
-import gi
-from pkg_resources import resource_stream
+import gi                                       # NOQA
+from pkg_resources import resource_stream       # NOQA
 
 
 # Internationalization.
@@ -89,3 +92,7 @@ gi.require_version('GdkPixbuf', '2.0')
 gi.require_version('GObject', '2.0')
 gi.require_version('GLib', '2.0')
 gi.require_version('Pango', '1.0')
+
+
+from pastetray import profiling     # NOQA
+profiling.add("package import", time.perf_counter() - _import_start)
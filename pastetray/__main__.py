@@ -25,9 +25,14 @@ import argparse
 import signal
 import sys
 
-from gi.repository import Gtk, GObject
+from pastetray import profiling
 
-from pastetray import _, backend, functions, lock, settings, trayicon
+with profiling.timed("GTK+ import"):
+    from gi.repository import Gtk, GLib, GObject
+
+from pastetray import (
+    _, backend, dedup, expiry, functions, history, lock, new_paste, outbox,
+    settings, trayicon)
 
 
 # Ctrl+C interrupting and threads.
@@ -35,18 +40,69 @@ signal.signal(signal.SIGINT, signal.SIG_DFL)
 GObject.threads_init()
 
 
+def _report_startup(json_path=None):
+    """Print the startup times and optionally save them to json_path."""
+    print("PasteTray startup times:")
+    profiling.report()
+    if json_path is not None:
+        try:
+            profiling.save(json_path)
+        except OSError as e:
+            print("Cannot write {}: {}".format(json_path, e), file=sys.stderr)
+
+
+def _apply_settings(section='General', key=None):
+    """Give the values of settings to the modules that use them.
+
+    This is also called when a setting changes.
+    """
+    if section != 'General':
+        return
+    config = settings.settings
+    backend.paste_queue.set_limits(
+        config.get_int('General', 'paste_workers'),
+        config.get_int('General', 'pastes_per_pastebin'))
+    backend.retries = config.get_int('General', 'paste_retries')
+    dedup.enabled = config.get_bool('General', 'reuse_identical_pastes')
+    expiry.enabled = config.get_bool('General', 'check_expired_pastes')
+
+
 def main(args=None):
     """Run the program."""
-    # TODO: Add arguments to parse.
     parser = argparse.ArgumentParser()
-    parser.parse_args(args)
+    parser.add_argument(
+        '--profile-startup', action='store_true',
+        help=_("print how long different parts of starting up take"))
+    parser.add_argument(
+        '--profile-json', metavar='FILE',
+        help=_("also write the startup times to a JSON file"))
+    args = parser.parse_args(args)
 
     try:
         with lock.locked():
-            settings.load()
+            with profiling.timed("settings.load()"):
+                settings.load()
+            _apply_settings()
+            settings.settings.listeners.append(_apply_settings)
+            # backend.load() times each pastebin separately.
             backend.load()
-            trayicon.load()
-            functions.update_trayicon()
+            with profiling.timed("history.load()"):
+                history.load()
+            expiry.start()
+            if settings.settings.get_bool('General',
+                                          'refresh_syntax_choices'):
+                backend.refresh_syntaxes()
+            with profiling.timed("outbox.load()"):
+                outbox.load()
+            with profiling.timed("trayicon.load()"):
+                trayicon.load()
+            with profiling.timed("functions.update_trayicon()"):
+                functions.update_trayicon()
+            # The first new paste window is created when PasteTray has
+            # started, so it can be shown right away when it's needed.
+            GLib.idle_add(new_paste.prepare)
+            if args.profile_startup or args.profile_json:
+                _report_startup(args.profile_json)
             Gtk.main()
     except lock.IsLocked:
         dialog = Gtk.MessageDialog(
@@ -61,7 +117,6 @@ def main(args=None):
         dialog.destroy()
     finally:
         settings.save()
-        backend.save()
 
     # This function is not meant to be ran multiple times.
     sys.exit()
@@ -19,85 +19,803 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-"""Load pastebins and take care of recent pastes."""
+"""Load pastebins and paste to them."""
 
+import bisect
 import collections
+import functools
 import importlib
+import importlib.util
+import itertools
+import json
 import os
+import random
 import re
 import threading
+import time
 
-from pastetray import filepaths
+from pastetray import _, dedup, filepaths, history, profiling, syntaxes
 from pastetray.filepaths import resource_listdir
 
 
-pastebins = {}    # These are name: module pairs.
-recent_pastes = collections.deque(maxlen=10)
+pastebins = {}    # These are name: pastebin pairs, see _LazyPastebin.
 
-_RECENT_PASTES_PATH = os.path.join(filepaths.user_config_dir,
-                                   'recent_pastes.txt')
+_MANIFEST_PATH = os.path.join(filepaths.user_cache_dir, 'pastebins.json')
+
+# These are the pastebin module attributes that are stored in the
+# manifest. Everything else is looked up from the module itself.
+_MANIFEST_ATTRS = ['name', 'url', 'expiry_days', 'paste_args']
+
+
+# Failed pastes are retried after _RETRY_DELAY seconds, then after twice
+# as long and so on, but never waiting more than _RETRY_DELAY_MAX
+# seconds. Some randomness is added to the delays.
+retries = 2
+_RETRY_DELAY = 1
+_RETRY_DELAY_MAX = 30
+
+# New syntax choices are downloaded this many seconds after startup.
+_SYNTAX_REFRESH_DELAY = 2 * 60
 
 
 class PastebinError(Exception):
     """This is raised when a pastebin script is causing issues."""
 
 
+class _LazyPastebin:
+    """A pastebin module that is imported when it's needed.
+
+    The attributes in _MANIFEST_ATTRS are available without importing
+    the module, other attributes like paste and syntax_choices import
+    it.
+    """
+
+    def __init__(self, modulename, info):
+        """Initialize the pastebin.
+
+        The info argument should be a dictionary with _MANIFEST_ATTRS
+        as keys.
+        """
+        self.modulename = modulename
+        self.__dict__.update(info)
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _import(self):
+        """Import the module if it's not imported yet and return it."""
+        # The pasting threads may also use this.
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self.modulename)
+            return self._module
+
+    def __getattr__(self, attribute):
+        # This is called only if the attribute is not in self.__dict__.
+        if attribute.startswith('__'):
+            raise AttributeError(attribute)
+        return getattr(self._import(), attribute)
+
+    def __repr__(self):
+        return '<pastebin {!r} from {!r}>'.format(self.name, self.modulename)
+
+
+def _module_key(modulename):
+    """Return a list for checking if a pastebin module has changed.
+
+    None is returned if the module is not a regular file, e.g. PasteTray
+    is running from a zipfile.
+    """
+    spec = importlib.util.find_spec(modulename)
+    try:
+        stat = os.stat(spec.origin)
+    except (OSError, TypeError):
+        return None
+    return [stat.st_mtime, stat.st_size]
+
+
+def _load_manifest():
+    """Return the content of the pastebin manifest file."""
+    try:
+        with open(_MANIFEST_PATH, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        # The file doesn't exist or it's invalid. It will be recreated.
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return manifest
+
+
+def _save_manifest(manifest):
+    """Write the pastebin manifest file."""
+    try:
+        with open(_MANIFEST_PATH, 'w') as f:
+            json.dump(manifest, f, indent=4)
+    except OSError:
+        # The manifest is only a cache, and we'll just import all
+        # pastebins on the next startup.
+        pass
+
+
+def _get_info(modulename, manifest):
+    """Return a manifest entry for a pastebin module.
+
+    The module is imported only if the manifest doesn't have an
+    up-to-date entry for it. The manifest is updated if needed.
+    """
+    key = _module_key(modulename)
+    entry = manifest.get(modulename)
+    if key is not None and entry is not None and entry.get('key') == key:
+        return {attr: entry[attr] for attr in _MANIFEST_ATTRS}
+
+    module = importlib.import_module(modulename)
+    info = {attr: getattr(module, attr) for attr in _MANIFEST_ATTRS}
+    if key is None:
+        manifest.pop(modulename, None)
+    else:
+        manifest[modulename] = dict(info, key=key)
+    return info
+
+
 def load():
-    """Load pastebins and recent pastes."""
+    """Load the pastebins."""
     pastebins.clear()
+    manifest = _load_manifest()
+    old_manifest = json.dumps(manifest, sort_keys=True)
+    modulenames = []
+
     for name in resource_listdir('pastetray', 'pastebins'):
         if not re.search(r'^[a-z][a-z_]*\.py$', name):
             # Not a valid PasteTray pastebin module name.
             continue
         modulename = 'pastetray.pastebins.' + os.path.splitext(name)[0]
-        module = importlib.import_module(modulename)
-        if module.name in pastebins:
+        modulenames.append(modulename)
+        with profiling.timed("backend.load(): " + modulename):
+            info = _get_info(modulename, manifest)
+        pastebin = _LazyPastebin(modulename, info)
+        if pastebin.name in pastebins:
             raise PastebinError("there are two pastebins named {!r}"
-                                .format(module.name))
-        pastebins[module.name] = module
+                                .format(pastebin.name))
+        pastebins[pastebin.name] = pastebin
     if not pastebins:
         raise PastebinError("no pastebins found")
 
-    recent_pastes.clear()
-    try:
-        with open(_RECENT_PASTES_PATH, 'r') as f:
-            recent_pastes.extend(line.strip() for line in f)
-    except FileNotFoundError:
-        # The file will be created when it's saved.
-        pass
+    # Forget about removed pastebins.
+    for modulename in list(manifest):
+        if modulename not in modulenames:
+            del manifest[modulename]
+    if json.dumps(manifest, sort_keys=True) != old_manifest:
+        _save_manifest(manifest)
+
+
+def prewarm(pastebin):
+    """Get ready for pasting to a pastebin in a background thread.
+
+    Pastebin scripts may define a prewarm() function that connects to
+    the pastebin in advance. Nothing is done if the pastebin has no
+    prewarm() function.
+    """
+    def run():
+        # This imports the pastebin module if it's not imported yet, so
+        # it's good that this runs in a thread.
+        func = getattr(pastebin, 'prewarm', None)
+        if func is not None:
+            func()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
 
+def refresh_syntaxes(delay=_SYNTAX_REFRESH_DELAY):
+    """Download new syntax choices in a background thread.
 
-def save():
-    """Save the list of recent pastes."""
-    with open(_RECENT_PASTES_PATH, 'w') as f:
-        for url in recent_pastes:
-            print(url, file=f)
+    The thread waits for delay seconds first, so it doesn't slow down
+    starting PasteTray. See syntaxes.refresh().
+    """
+    def run():
+        time.sleep(delay)
+        for pastebin in list(pastebins.values()):
+            # This doesn't import pastebins without syntax choices.
+            if 'syntax' not in pastebin.paste_args:
+                continue
+            try:
+                syntaxes.refresh(pastebin)
+            except Exception:
+                # The network may be down or the pastebin may have
+                # changed. The old choices work until the next start.
+                pass
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+
+class _CircuitBreaker:
+    """Stop pasting to a pastebin that keeps failing.
+
+    After FAILURES failed pastes in a row, the breaker opens and pastes
+    fail immediately for COOLDOWN seconds. After that, one paste is
+    allowed to try the pastebin again, and the breaker closes if it
+    succeeds.
+    """
+
+    FAILURES = 3
+    COOLDOWN = 5 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened = None         # time.monotonic() or None
+        self._trying = False
+
+    def is_open(self):
+        """Check if the pastebin seems to be down."""
+        with self._lock:
+            return self._opened is not None
+
+    def allow(self):
+        """Check if a paste may be attempted now."""
+        with self._lock:
+            if self._opened is None:
+                return True
+            if self._trying:
+                # Another paste is already trying the pastebin.
+                return False
+            if time.monotonic() - self._opened >= self.COOLDOWN:
+                self._trying = True
+                return True
+            return False
+
+    def success(self):
+        """Close the breaker after a successful paste."""
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trying = False
+
+    def failure(self):
+        """Count a failure and open the breaker if needed."""
+        with self._lock:
+            self._failures += 1
+            if self._trying or self._failures >= self.FAILURES:
+                self._opened = time.monotonic()
+            self._trying = False
+
+    def cancel(self):
+        """Forget about a paste that was allowed but didn't say anything."""
+        with self._lock:
+            self._trying = False
+
+
+# These are pastebin module name: _CircuitBreaker pairs.
+_breakers = collections.defaultdict(_CircuitBreaker)
+
+
+def is_degraded(pastebin):
+    """Check if pasting to a pastebin has failed many times in a row."""
+    return _breakers[pastebin.modulename].is_open()
+
+
+def _backoff(attempt):
+    """Return the number of seconds to wait before retrying.
+
+    This is exponential backoff with full jitter, so many pastes that
+    failed at the same time are not retried at the same time.
+    """
+    return random.uniform(0, min(_RETRY_DELAY_MAX,
+                                 _RETRY_DELAY * 2 ** attempt))
 
 
-class PastingThread(threading.Thread):
-    """Thread for pasting.
+class PasteJob:
+    """A paste that is waiting in a PasteQueue or running.
 
-    When the pasting is done the thread's .is_alive() method will return
-    False and the thread will have two new attributes, success and
-    response. success is True if the pasting succeeded and otherwise
-    False, and response will be the paste's URL or an error message.
+    The state attribute is 'waiting', 'running', 'done' or 'cancelled'.
     """
 
-    def __init__(self, pastebin, getters, **kwargs):
-        """Initialize the thread.
+    def __init__(self, pastebin, kwargs, callback, number):
+        """Initialize the job.
+
+        kwargs['content'] must be a sources.ContentSource. The callback
+        will be called with two arguments, success and response. success
+        is True if the pasting succeeded and otherwise False, and
+        response will be the paste's URL or an error message.
+        """
+        self.pastebin = pastebin
+        self.kwargs = kwargs
+        self.callback = callback
+        self.size = kwargs['content'].size
+        self.state = 'waiting'
+        self._number = number
+
+    def __lt__(self, other):
+        # Small pastes first, and pastes of the same size in the order
+        # they were added.
+        return (self.size, self._number) < (other.size, other._number)
+
+    def _paste(self):
+        """Call the pastebin's .paste() method once and return the URL."""
+        kwargs = self.kwargs.copy()
+        if getattr(self.pastebin, 'content_streaming', False):
+            # A previous attempt may have read some of the content.
+            kwargs['content'] = kwargs['content'].copy()
+        else:
+            kwargs['content'] = kwargs['content'].text()
+        return str(self.pastebin.paste(**kwargs))
 
-        The getters argument should be a dictionary of possible pastebin
-        paste_args and functions or methods for getting values for them.
+    def _find_previous(self):
+        """Return (dedup key, URL of an identical paste or None).
+
+        The key is None if dedup is disabled or it doesn't work.
         """
-        threading.Thread.__init__(self, **kwargs)
-        self._pastebin = pastebin
-        self._kwargs = {arg: getters[arg]() for arg in pastebin.paste_args}
+        if not dedup.enabled:
+            return (None, None)
+        try:
+            key = dedup.make_key(self.pastebin, self.kwargs)
+            return (key, dedup.lookup(key))
+        except Exception:
+            # Pasting works without dedup, and if the content can't be
+            # read, pasting will report that.
+            return (None, None)
 
     def run(self):
-        """Call the pastebin's .paste() method."""
+        """Paste, retrying if needed, and then call the callback."""
         try:
-            self.response = str(self._pastebin.paste(**self._kwargs))
-            self.success = True
+            success, response = self._run()
         except Exception as e:
-            self.response = "{.__name__}: {}".format(type(e), e)
-            self.success = False
+            # Without the callback, the paste would wait forever.
+            success = False
+            response = "{.__name__}: {}".format(type(e), e)
+        self.callback(success, response)
+
+    def _run(self):
+        """Paste and return (success, response)."""
+        # requests is slow to import, so this is not imported on startup.
+        from pastetray import connections
+
+        key, url = self._find_previous()
+        if url is not None:
+            # This has been pasted before.
+            return (True, url)
+
+        breaker = _breakers[self.pastebin.modulename]
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                if attempt == 0:
+                    success = False
+                    response = _("{} is not responding. Try again later "
+                                 "or use another pastebin.").format(
+                                     self.pastebin.name)
+                # Otherwise the previous error message is used.
+                break
+
+            try:
+                response = self._paste()
+                success = True
+                breaker.success()
+                break
+            except Exception as e:
+                response = "{.__name__}: {}".format(type(e), e)
+                success = False
+                if connections.is_host_failure(e):
+                    breaker.failure()
+                else:
+                    breaker.cancel()
+                if attempt >= retries or not connections.is_retryable(e):
+                    break
+
+            time.sleep(_backoff(attempt))
+            attempt += 1
+
+        if success and key is not None:
+            expiry = self.kwargs.get('expiry', self.pastebin.expiry_days[0])
+            try:
+                dedup.remember(key, response, expiry)
+            except Exception:
+                # The paste worked, so it must not be reported as failed.
+                pass
+        return (success, response)
+
+
+class PasteQueue:
+    """Run pastes in a limited number of worker threads.
+
+    Small pastes are started before big pastes, so a quick one-line
+    paste doesn't need to wait for a big log file to be uploaded. No
+    more than pastes_per_pastebin pastes to the same pastebin run at the
+    same time.
+
+    Everything in the listeners list is called without arguments when a
+    job is added, started or finished. Note that they are called in the
+    worker threads, so they must not use GTK+ directly.
+    """
+
+    def __init__(self, workers=3, pastes_per_pastebin=2):
+        """Initialize the queue."""
+        self.listeners = []
+        self._workers = workers
+        self._pastes_per_pastebin = pastes_per_pastebin
+        self._condition = threading.Condition()
+        self._waiting = []      # Sorted list of PasteJobs.
+        self._running = []
+        self._threads = []
+        self._counter = itertools.count()
+
+    def set_limits(self, workers, pastes_per_pastebin):
+        """Change the number of workers and pastes per pastebin."""
+        with self._condition:
+            self._workers = max(workers, 1)
+            self._pastes_per_pastebin = max(pastes_per_pastebin, 1)
+            self._start_workers()
+            # Waiting workers may be able to start something now.
+            self._condition.notify_all()
+
+    def add(self, pastebin, kwargs, callback):
+        """Add a paste to the queue and return a PasteJob.
+
+        The kwargs will be passed to pastebin.paste(). See PasteJob for
+        the callback.
+        """
+        with self._condition:
+            job = PasteJob(pastebin, kwargs, callback, next(self._counter))
+            bisect.insort(self._waiting, job)
+            self._start_workers()
+            self._condition.notify_all()
+        self._notify_listeners()
+        return job
+
+    def cancel(self, job):
+        """Remove a job from the queue if it hasn't started yet.
+
+        Running jobs cannot be interrupted, so they are left alone.
+        """
+        with self._condition:
+            if job not in self._waiting:
+                return
+            self._waiting.remove(job)
+            job.state = 'cancelled'
+        self._notify_listeners()
+
+    def jobs(self):
+        """Return a list of running and waiting jobs.
+
+        The running jobs are first, and the waiting jobs are in the
+        order they will be started in.
+        """
+        with self._condition:
+            return self._running + self._waiting
+
+    def _start_workers(self):
+        """Start new worker threads if needed.
+
+        The condition must be acquired when this is called.
+        """
+        self._threads = [t for t in self._threads if t.is_alive()]
+        wanted = min(self._workers, len(self._waiting) + len(self._running))
+        while len(self._threads) < wanted:
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _find_job(self):
+        """Return a job that can be started or None."""
+        running = collections.Counter(
+            job.pastebin.name for job in self._running)
+        for job in self._waiting:
+            if running[job.pastebin.name] < self._pastes_per_pastebin:
+                return job
+        return None
+
+    def _take(self):
+        """Wait for a job that can be started and return it.
+
+        None is returned if the worker should stop.
+        """
+        with self._condition:
+            while True:
+                if len(self._threads) > self._workers:
+                    # set_limits() decreased the number of workers.
+                    self._threads.remove(threading.current_thread())
+                    return None
+                job = self._find_job()
+                if job is not None:
+                    self._waiting.remove(job)
+                    self._running.append(job)
+                    job.state = 'running'
+                    return job
+                self._condition.wait()
+
+    def _worker(self):
+        """Run jobs forever."""
+        while True:
+            job = self._take()
+            if job is None:
+                return
+            self._notify_listeners()
+            try:
+                job.run()
+            finally:
+                with self._condition:
+                    self._running.remove(job)
+                    job.state = 'done'
+                    self._condition.notify_all()
+                self._notify_listeners()
+
+    def _notify_listeners(self):
+        for listener in self.listeners:
+            listener()
+
+
+paste_queue = PasteQueue()
+
+
+class _FailoverChain:
+    """A paste and the pastebins to try if it fails."""
+
+    def __init__(self, pastebin, kwargs, failover):
+        """Initialize the chain.
+
+        The kwargs are for the pastebin, and they are converted for the
+        other pastebins when needed.
+        """
+        self.pastebin = pastebin
+        self.kwargs = kwargs
+        self.failover = list(failover)
+        self.errors = []    # (pastebin, error message) pairs
+
+    def next_paste(self):
+        """Return a (pastebin, kwargs) pair to try next or None."""
+        while self.failover:
+            target = self.failover.pop(0)
+            if (not is_degraded(target) and
+                    can_replace(self.kwargs, self.pastebin, target)):
+                return (target,
+                        convert_args(self.kwargs, self.pastebin, target))
+        return None
+
+    def error_message(self):
+        """Return an error message about all failed pastes."""
+        if len(self.errors) == 1:
+            return self.errors[0][1]
+        return '\n'.join('{}: {}'.format(pastebin.name, message)
+                         for pastebin, message in self.errors)
+
+
+class PasteGroup:
+    """Paste the same content to several pastebins at the same time.
+
+    With the FIRST_SUCCESS policy, the callback is called as soon as one
+    of the pastes succeeds and the other pastes are cancelled. With the
+    ALL policy, the callback is called when all pastes are done. The
+    callback is called once with a list of (pastebin, success, response)
+    tuples, and like the PasteJob callbacks, it's called in a worker
+    thread. The pastebin is the pastebin that was used in the end, so
+    it's not the requested pastebin if failover was needed.
+
+    The successful pastes that are kept are added to the history, so
+    the pastes that lose with FIRST_SUCCESS are not.
+    """
+
+    FIRST_SUCCESS = 'first'
+    ALL = 'all'
+
+    def __init__(self, queue, pastes, policy, callback):
+        """Add the pastes to the queue.
+
+        The pastes should be a list of (pastebin, kwargs, failover)
+        tuples. If pasting to a pastebin fails, the pastebins in the
+        failover list that can make the same paste are tried in order.
+        """
+        self._queue = queue
+        self.policy = policy
+        self._callback = callback
+        self._count = len(pastes)
+        self._results = []
+        self._done = False
+        self._lock = threading.Lock()
+        self.pastes = pastes
+        self.jobs = []
+
+        # A job may finish before the other jobs are added, so
+        # _on_job_done() must wait until everything is added.
+        with self._lock:
+            for pastebin, kwargs, failover in pastes:
+                chain = _FailoverChain(pastebin, kwargs, failover)
+                self._add_job(chain, pastebin, kwargs)
+
+    def _add_job(self, chain, pastebin, kwargs):
+        callback = functools.partial(self._on_job_done, chain, pastebin,
+                                     kwargs)
+        self.jobs.append(self._queue.add(pastebin, kwargs, callback))
+
+    def _on_job_done(self, chain, pastebin, kwargs, success, response):
+        with self._lock:
+            if self._done:
+                # The group finished before this job.
+                return
+
+            if not success:
+                chain.errors.append((pastebin, response))
+                next_paste = chain.next_paste()
+                if next_paste is not None:
+                    self._add_job(chain, *next_paste)
+                    return
+                response = chain.error_message()
+
+            result = (pastebin, success, response)
+            self._results.append(result)
+            if success and self.policy == self.FIRST_SUCCESS:
+                results = [result]
+            elif len(self._results) == self._count:
+                results = self._results
+            else:
+                results = None
+            if results is not None:
+                self._done = True
+
+        if success:
+            _add_to_history(pastebin, kwargs, response)
+        if results is None:
+            return
+        for job in self.jobs:
+            self._queue.cancel(job)
+        self._callback(results)
+
+
+def _add_to_history(pastebin, kwargs, url):
+    """Add a successful paste to the history."""
+    expiry = kwargs.get('expiry', pastebin.expiry_days[0])
+    history.add(url, pastebin.name, expiry, kwargs['content'].size,
+                kwargs.get('title'))
+
+
+def _days(expiry):
+    """Convert an expiry_days item to a number that can be compared."""
+    return float('inf') if expiry < 0 else expiry
+
+
+def _convert_expiry(expiry, target):
+    """Return the target pastebin's expiry that is closest to expiry.
+
+    Pastes are not deleted earlier than requested unless the target has
+    no long enough expiry days.
+    """
+    if expiry in target.expiry_days:
+        return expiry
+    longer = [exp for exp in target.expiry_days
+              if _days(exp) >= _days(expiry)]
+    if longer:
+        return min(longer, key=_days)
+    return max(target.expiry_days, key=_days)
+
+
+def _find_syntax(syntax, source, target):
+    """Return the target's syntax_choices value that matches syntax.
+
+    The syntax should be a syntax_choices value of the source. None is
+    returned if the target has no matching syntax.
+    """
+    # The bundled pastebins use the same syntax IDs.
+    if syntaxes.find_name(syntax, target) is not None:
+        return syntax
+
+    name = syntaxes.find_name(syntax, source)
+    if name is None:
+        return None
+    if name in target.syntax_choices:
+        return target.syntax_choices[name]
+    for target_name, value in target.syntax_choices.items():
+        if target_name.lower() == name.lower():
+            return value
+    return None
+
+
+def _convert_syntax(syntax, source, target):
+    """Like _find_syntax(), but return the target's default if needed.
+
+    The syntax can also be None if the source doesn't support syntax
+    highlighting.
+    """
+    result = None
+    if syntax is not None:
+        result = _find_syntax(syntax, source, target)
+    if result is None:
+        return target.syntax_choices[target.syntax_default]
+    return result
+
+
+def can_replace(kwargs, source, target):
+    """Check if target can be used instead of source for a paste.
+
+    The target must support the title and syntax highlighting if they
+    are used, and it must not delete the paste earlier than requested.
+    """
+    if kwargs.get('title') and 'title' not in target.paste_args:
+        return False
+
+    syntax = kwargs.get('syntax')
+    if (syntax is not None and
+            syntax != source.syntax_choices[source.syntax_default]):
+        if 'syntax' not in target.paste_args:
+            return False
+        if _find_syntax(syntax, source, target) is None:
+            return False
+
+    if 'expiry' in kwargs:
+        expiry = _days(kwargs['expiry'])
+        if not any(_days(exp) >= expiry for exp in target.expiry_days):
+            return False
+    return True
+
+
+def failover_pastebins(source, order=()):
+    """Return a list of pastebins to try if pasting to source fails.
+
+    The pastebins named in order are first, and the rest of them are
+    in alphabetical order. can_replace() is checked when pasting.
+    """
+    names = [name for name in order if name in pastebins]
+    names.extend(sorted(pastebins, key=str.lower))
+    result = []
+    for name in names:
+        pastebin = pastebins[name]
+        if pastebin is not source and pastebin not in result:
+            result.append(pastebin)
+    return result
+
+
+def convert_args(kwargs, source, target):
+    """Return keyword arguments for pasting to target instead of source.
+
+    The expiry and syntax are converted to the closest values the target
+    supports.
+    """
+    result = {}
+    for arg in target.paste_args:
+        if arg == 'content':
+            # Streaming pastebins read the content, so each paste needs
+            # a content source of its own.
+            result[arg] = kwargs['content'].copy()
+        elif arg == 'expiry':
+            expiry = kwargs.get('expiry', source.expiry_days[0])
+            result[arg] = _convert_expiry(expiry, target)
+        elif arg == 'syntax':
+            result[arg] = _convert_syntax(kwargs.get('syntax'), source, target)
+        else:
+            result[arg] = kwargs.get(arg, '')
+    return result
+
+
+def start_pasting(pastebins, getters, callback,
+                  policy=PasteGroup.FIRST_SUCCESS, failover=()):
+    """Add pastes to paste_queue and return a PasteGroup.
+
+    The pastebins argument should be a non-empty list of pastebins. The
+    first pastebin is the pastebin the user selected, and the paste
+    arguments are converted for the other pastebins. The getters
+    argument should be a dictionary of possible pastebin paste_args and
+    functions or methods for getting values for them. See PasteGroup
+    for the policy and the callback.
+
+    The failover pastebins are tried if pasting to the selected pastebin
+    fails, see failover_pastebins().
+    """
+    source = pastebins[0]
+    kwargs = {arg: getters[arg]() for arg in source.paste_args}
+    for pastebin in pastebins[1:]:
+        for arg in pastebin.paste_args:
+            # The expiry and syntax getters return values that only work
+            # with the source pastebin.
+            if arg not in kwargs and arg not in {'expiry', 'syntax'}:
+                kwargs[arg] = getters[arg]()
+
+    # Pastebins that are already pasted to are not useful for failover.
+    failover = [pastebin for pastebin in failover
+                if pastebin not in pastebins]
+    source_kwargs = {arg: kwargs[arg] for arg in source.paste_args}
+    pastes = [(source, source_kwargs, failover)]
+    for pastebin in pastebins[1:]:
+        pastes.append((pastebin, convert_args(kwargs, source, pastebin), []))
+    return PasteGroup(paste_queue, pastes, policy, callback)
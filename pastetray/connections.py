@@ -0,0 +1,167 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""HTTP connections shared by all pastebins.
+
+Pastebin scripts should use session() instead of requests.post() and
+friends. This way connections to the pastebins are kept alive between
+pastes, so only the first paste needs to connect.
+"""
+
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from pastetray import USER_AGENT
+from pastetray.settings import settings
+
+# The maximum number of different hosts to keep connections to, and the
+# maximum number of simultaneous connections to each host.
+MAX_HOSTS = 10
+MAX_CONNECTIONS_PER_HOST = 4
+
+# These HTTP statuses mean that the paste was not made and trying again
+# later is likely to help. A gateway that responds with 502 or 504 may
+# have given the paste to the pastebin already, so retrying those could
+# make two pastes.
+_RETRYABLE_STATUSES = {429, 503}
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_adapter():
+    """Return the transport adapter that owns the connection pool."""
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            # The pool blocks when a host has MAX_CONNECTIONS_PER_HOST
+            # connections in use instead of opening more connections.
+            _adapter = HTTPAdapter(pool_connections=MAX_HOSTS,
+                                   pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                                   pool_block=True)
+        return _adapter
+
+
+def timeouts():
+    """Return a (connect_timeout, read_timeout) tuple in seconds."""
+    return (settings.get_float('General', 'connect_timeout'),
+            settings.get_float('General', 'read_timeout'))
+
+
+class _Session(requests.Session):
+    """A requests.Session with timeouts by default."""
+
+    def request(self, *args, **kwargs):
+        # Without a timeout, requests waits forever for dead hosts.
+        kwargs.setdefault('timeout', timeouts())
+        return requests.Session.request(self, *args, **kwargs)
+
+
+def session():
+    """Return a requests.Session for the current thread.
+
+    requests.Session objects are not guaranteed to be thread-safe, so
+    each thread gets its own session. All sessions share one connection
+    pool, have PasteTray's User-Agent set and use timeouts() unless
+    another timeout is given.
+    """
+    try:
+        return _local.session
+    except AttributeError:
+        pass
+
+    adapter = _get_adapter()
+    result = _Session()
+    result.headers['User-Agent'] = USER_AGENT
+    result.mount('http://', adapter)
+    result.mount('https://', adapter)
+    _local.session = result
+    return result
+
+
+def prewarm(url):
+    """Connect to url's host and leave the connection in the pool.
+
+    The next request to the same host can use the connection, so it
+    doesn't need to wait for DNS lookups and TCP or TLS handshakes.
+    Errors are ignored because the actual paste will report them anyway.
+    """
+    try:
+        # The session uses the timeouts from the settings.
+        response = session().head(url, allow_redirects=False)
+        response.close()
+    except requests.RequestException:
+        pass
+
+
+def is_retryable(error):
+    """Check if trying to paste again might help after an error.
+
+    Only errors that happen before the paste is sent, like failing to
+    connect, are retryable. Otherwise retrying might make two pastes.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError):
+        # urllib3 wraps the real reason in a MaxRetryError.
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    if isinstance(error, requests.HTTPError):
+        return (error.response is not None and
+                error.response.status_code in _RETRYABLE_STATUSES)
+    # Pastebins that don't use HTTP, like termbin.
+    return isinstance(error, (ConnectionRefusedError, socket.gaierror))
+
+
+def is_host_failure(error):
+    """Check if an error means that the pastebin may be down.
+
+    Unlike the other errors, HTTP client errors like 400 Bad Request
+    are usually caused by the paste, not the pastebin.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, (requests.RequestException, OSError))
+
+
+def is_gone(url):
+    """Check if the page at url has been removed.
+
+    This returns True if the server says that the page doesn't exist,
+    False if it exists and None if it's not known, e.g. because the
+    server can't be reached.
+    """
+    try:
+        response = session().head(url, allow_redirects=True)
+        response.close()
+    except requests.RequestException:
+        return None
+    if response.status_code in (404, 410):
+        return True
+    if response.status_code >= 500 or response.status_code == 429:
+        return None
+    return False
@@ -0,0 +1,140 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Reuse the URLs of identical pastes.
+
+People often paste the same thing many times in a row. Instead of
+making a new paste every time, the URL of the previous paste is used if
+the paste hasn't expired yet.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+from pastetray import filepaths
+
+# Set this to False to always make new pastes.
+enabled = True
+
+_INDEX_PATH = os.path.join(filepaths.user_cache_dir, 'dedup.json')
+_MAX_ENTRIES = 500
+
+# Pastes that expire sooner than this (in seconds) are not reused.
+_EXPIRY_MARGIN = 60 * 60
+
+_index = None   # key: [url, creation time, expiry days], oldest first
+_lock = threading.Lock()
+
+
+def _load():
+    """Read the index file if it hasn't been read yet.
+
+    The lock must be acquired when this is called.
+    """
+    global _index
+    if _index is not None:
+        return
+    _index = collections.OrderedDict()
+    try:
+        with open(_INDEX_PATH, 'r') as f:
+            _index.update(json.load(
+                f, object_pairs_hook=collections.OrderedDict))
+    except (OSError, ValueError):
+        # The file doesn't exist or it's invalid. It's only a cache.
+        pass
+
+
+def _save():
+    """Write the index file.
+
+    The lock must be acquired when this is called.
+    """
+    temp_path = _INDEX_PATH + '.tmp'
+    try:
+        with open(temp_path, 'w') as f:
+            # json.dump() keeps the order, so the LRU order is saved.
+            json.dump(_index, f)
+        os.replace(temp_path, _INDEX_PATH)
+    except OSError:
+        pass
+
+
+def _is_alive(created, expiry):
+    """Check if a paste is probably still available."""
+    if expiry < 0:
+        return True
+    expires = created + expiry * 24 * 60 * 60
+    return time.time() < expires - _EXPIRY_MARGIN
+
+
+def make_key(pastebin, kwargs):
+    """Return a hash of a paste.
+
+    The kwargs should be the pastebin's paste_args with the content as
+    a sources.ContentSource. The username is not included because it
+    doesn't change what the paste looks like much.
+    """
+    details = [pastebin.name, kwargs.get('syntax'), kwargs.get('title'),
+               kwargs.get('expiry')]
+    sha = hashlib.sha256(json.dumps(details).encode('utf-8') + b'\0')
+    for chunk in kwargs['content'].chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def lookup(key):
+    """Return the URL of a previous paste or None."""
+    if not enabled:
+        return None
+    with _lock:
+        _load()
+        try:
+            url, created, expiry = _index[key]
+        except KeyError:
+            return None
+        if not _is_alive(created, expiry):
+            del _index[key]
+            _save()
+            return None
+        # This is the most recently used entry now.
+        _index.move_to_end(key)
+        _save()
+        return url
+
+
+def remember(key, url, expiry):
+    """Add a paste to the index.
+
+    The expiry should be an item of the pastebin's expiry_days.
+    """
+    if not enabled:
+        return
+    with _lock:
+        _load()
+        _index[key] = [url, time.time(), expiry]
+        _index.move_to_end(key)
+        while len(_index) > _MAX_ENTRIES:
+            _index.popitem(last=False)
+        _save()
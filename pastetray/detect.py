@@ -0,0 +1,259 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Guess the syntax highlighting of a paste.
+
+The guesses are Pygments lexer names like 'python3' or 'bash'. Most
+pastebins use Pygments, so the guesses can be usually found in their
+syntax_choices values.
+
+Only the beginning and the end of the content are looked at, so
+guessing is fast even for big pastes.
+"""
+
+import collections
+import hashlib
+import os
+import re
+import threading
+import time
+
+from pastetray import syntaxes
+
+# This many characters are looked at from both ends of the content.
+SAMPLE_SIZE = 4 * 1024
+
+# Keyword counting stops after this many seconds.
+_TIME_BUDGET = 0.05
+
+_EXTENSIONS = {
+    '.py': 'python3', '.pyw': 'python3', '.sh': 'bash', '.bash': 'bash',
+    '.c': 'c', '.h': 'c', '.cpp': 'cpp', '.cc': 'cpp', '.cxx': 'cpp',
+    '.hpp': 'cpp', '.cs': 'csharp', '.java': 'java', '.js': 'js',
+    '.html': 'html', '.htm': 'html', '.css': 'css', '.xml': 'xml',
+    '.json': 'json', '.rb': 'rb', '.pl': 'perl', '.php': 'php',
+    '.go': 'go', '.rs': 'rust', '.sql': 'sql', '.lua': 'lua',
+    '.hs': 'haskell', '.diff': 'diff', '.patch': 'diff', '.yml': 'yaml',
+    '.yaml': 'yaml', '.ini': 'ini', '.cfg': 'ini', '.conf': 'ini',
+    '.tex': 'tex', '.ps1': 'powershell', '.mk': 'make',
+}
+_FILENAMES = {'makefile': 'make', 'gnumakefile': 'make'}
+
+# Interpreter names in shebangs, without version numbers.
+_INTERPRETERS = {
+    'python': 'python3', 'sh': 'bash', 'bash': 'bash', 'dash': 'bash',
+    'zsh': 'bash', 'ruby': 'rb', 'perl': 'perl', 'php': 'php',
+    'node': 'js', 'lua': 'lua', 'runhaskell': 'haskell',
+    'make': 'make', 'pwsh': 'powershell',
+}
+
+# Vim and Emacs modelines, e.g. "vim: ft=python" or "-*- mode: c -*-".
+_MODELINE_PATTERNS = [
+    re.compile(r'\bvim?:.*?\b(?:ft|filetype|syntax)=(\w+)'),
+    re.compile(r'-\*-.*?\bmode:\s*([\w+-]+)', re.IGNORECASE),
+    re.compile(r'-\*-\s*([\w+-]+)\s*-\*-'),
+]
+_MODELINE_NAMES = {
+    'python': 'python3', 'sh': 'bash', 'shell-script': 'bash',
+    'c++': 'cpp', 'javascript': 'js', 'ruby': 'rb', 'cperl': 'perl',
+    'makefile': 'make', 'cs': 'csharp', 'ps1': 'powershell',
+}
+
+# These are checked before counting keywords because they are easy to
+# recognize from the first line.
+_FIRST_LINE_PATTERNS = [
+    (re.compile(r'Traceback \(most recent call last\):'), 'py3tb'),
+    (re.compile(r'(diff |--- |Index: )'), 'diff'),
+    (re.compile(r'<\?php'), 'php'),
+    (re.compile(r'<!DOCTYPE html|<html', re.IGNORECASE), 'html'),
+    (re.compile(r'<\?xml'), 'xml'),
+    (re.compile(r'%YAML|---\s*$'), 'yaml'),
+]
+
+# Each match of these adds one point to the language, and the language
+# with most points wins.
+_KEYWORD_PATTERNS = [
+    ('python3', r'^\s*(def \w+\(.*\):|class \w+.*:|import \w+|from \S+ '
+                r'import |elif |if __name__ ==)|\bself\.|\bprint\('),
+    ('bash', r'^\s*(fi|done|esac|then|export \w+=)\s*$|\$\{\w+|\$\(|'
+             r'^\s*(echo|cd|sudo|apt-get|if \[) '),
+    ('c', r'#include\s*<\w+\.h>|\bprintf\(|\bmalloc\(|\bint main\(|'
+          r'\bstruct \w+\s*\{|->\w+'),
+    ('cpp', r'#include\s*<\w+>|\bstd::|\bnamespace \w+|\btemplate\s*<|'
+            r'\bcout\s*<<|\bpublic:|\bnullptr\b'),
+    ('csharp', r'^\s*using System|\bnamespace \w+|\bConsole\.Write|'
+               r'\bpublic (static )?(void|string|int) \w+\('),
+    ('java', r'\bpublic class \w+|\bSystem\.out\.print|^\s*import java\.|'
+             r'@Override|\bpublic static void main\('),
+    ('js', r'\bfunction\s*\w*\(|\b(var|let|const) \w+ =|=>|'
+           r'\bconsole\.log\(|\bdocument\.|\brequire\('),
+    ('html', r'</?(div|span|p|a|body|head|script|table)\b[^>]*>'),
+    ('css', r'^\s*[.#]?[\w-]+\s*\{|^\s*[\w-]+:\s*[^;]+;\s*$'),
+    ('json', r'^\s*"[^"]*"\s*:\s*'),
+    ('rb', r'^\s*(def \w+|end|require \'|puts |module \w+)\b|\.each do\b'),
+    ('perl', r'^\s*(my|use strict|use warnings|sub \w+)\b|\$_\b|=~ '),
+    ('php', r'\$\w+\s*=|\becho \$|->\w+\(|\bfunction \w+\(\$'),
+    ('go', r'^package \w+|\bfunc (\(\w+ \*?\w+\) )?\w+\(|:= |'
+           r'^import \(|\bfmt\.'),
+    ('rust', r'\bfn \w+\(|\blet mut \b|\bimpl\b|\bpub fn\b|'
+             r'println!\(|&mut |::new\('),
+    ('sql', r'\b(SELECT|INSERT INTO|CREATE TABLE|UPDATE|DELETE FROM|'
+            r'WHERE|JOIN)\b'),
+    ('lua', r'\blocal \w+ =|\bfunction \w+[.:]\w+\(|\bend\b|~=|\.\.'),
+    ('haskell', r'^\w+ :: |\bwhere$|^import qualified|<-|\bmodule \w+ '
+                r'where'),
+    ('diff', r'^(@@ .* @@|\+\+\+ |--- |[+-](?![+-]))'),
+    ('yaml', r'^\s*[\w-]+:\s+\S|^\s*- \w+'),
+    ('ini', r'^\s*\[[\w .-]+\]\s*$|^\s*\w+\s*=\s*'),
+    ('make', r'^[\w.-]+:( |$)|^\t\S|\$\(\w+\)'),
+    ('tex', r'\\(begin|end|documentclass|usepackage|section)\{'),
+    ('powershell', r'\$\w+\s*=|\b(Get|Set|New|Write)-\w+|-eq\b'),
+]
+_KEYWORD_PATTERNS = [(lexer, re.compile(pattern, re.MULTILINE))
+                     for lexer, pattern in _KEYWORD_PATTERNS]
+
+# This many keyword matches are needed for a guess.
+_MIN_SCORE = 3
+
+_cache = collections.OrderedDict()      # key: guess
+_CACHE_SIZE = 64
+_cache_lock = threading.Lock()
+
+
+def _from_filename(filename):
+    basename = os.path.basename(filename).lower()
+    if basename in _FILENAMES:
+        return _FILENAMES[basename]
+    return _EXTENSIONS.get(os.path.splitext(basename)[1])
+
+
+def _from_shebang(first_line):
+    match = re.match(r'#!\s*(\S+)(?:\s+(\S+))?', first_line)
+    if match is None:
+        return None
+    program = os.path.basename(match.group(1))
+    if program == 'env' and match.group(2):
+        program = match.group(2)
+    # python3.5 -> python
+    program = re.sub(r'[\d.]+$', '', program)
+    return _INTERPRETERS.get(program)
+
+
+def _from_modeline(lines):
+    for line in lines:
+        for pattern in _MODELINE_PATTERNS:
+            match = pattern.search(line)
+            if match is not None:
+                name = match.group(1).lower()
+                return _MODELINE_NAMES.get(name, name)
+    return None
+
+
+def _from_keywords(sample):
+    deadline = time.perf_counter() + _TIME_BUDGET
+    scores = {}
+    for lexer, pattern in _KEYWORD_PATTERNS:
+        if time.perf_counter() > deadline:
+            break
+        scores[lexer] = len(pattern.findall(sample))
+    if not scores:
+        return None
+    best = max(scores, key=scores.get)
+    if scores[best] < _MIN_SCORE:
+        return None
+    return best
+
+
+def _guess(head, tail, filename):
+    if filename is not None:
+        result = _from_filename(filename)
+        if result is not None:
+            return result
+
+    head_lines = head.lstrip().splitlines() or ['']
+    tail_lines = tail.splitlines()
+    result = (_from_shebang(head_lines[0]) or
+              _from_modeline(head_lines[:5] + tail_lines[-5:]))
+    if result is not None:
+        return result
+    for pattern, lexer in _FIRST_LINE_PATTERNS:
+        if pattern.match(head_lines[0]):
+            return lexer
+    return _from_keywords(head + '\n' + tail)
+
+
+def sample(text):
+    """Return a (head, tail) tuple of text for guess()."""
+    if len(text) <= 2 * SAMPLE_SIZE:
+        return (text, '')
+    return (text[:SAMPLE_SIZE], text[-SAMPLE_SIZE:])
+
+
+def guess(head, tail='', filename=None):
+    """Return a guessed Pygments lexer name or None.
+
+    The head and tail should be the first and last SAMPLE_SIZE
+    characters of the content, and the tail should be empty if the
+    content is short. Use sample() for getting them from a string. The
+    filename is used if the content comes from a file.
+    """
+    key = hashlib.sha1('\0'.join([head, tail, filename or ''])
+                       .encode('utf-8', errors='replace')).digest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    result = _guess(head, tail, filename)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def guess_later(head, tail, filename, callback):
+    """Run guess() in a thread and call callback with the result.
+
+    Note that the callback is called in the thread.
+    """
+    thread = threading.Thread(
+        target=lambda: callback(guess(head, tail, filename)))
+    thread.daemon = True
+    thread.start()
+
+
+# If a pastebin doesn't have a lexer, these are tried instead.
+_FALLBACKS = {
+    'python3': ['python'],
+    'py3tb': ['pytb', 'python3', 'python'],
+    'bash': ['sh', 'shell'],
+    'js': ['javascript'],
+}
+
+
+def find_syntax(lexer, pastebin):
+    """Return the pastebin's syntax_choices key for a lexer or None."""
+    for syntax_id in [lexer] + _FALLBACKS.get(lexer, []):
+        result = syntaxes.find_name(syntax_id, pastebin)
+        if result is not None:
+            return result
+    return None
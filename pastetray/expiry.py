@@ -0,0 +1,121 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Find out which pastes in the history have expired.
+
+Pastes made with PasteTray have a known expiry, so checking them is
+easy. Pastes with an unknown expiry, e.g. pastes from an old PasteTray
+version, are checked by asking their pastebin with HEAD requests. This
+runs in a background thread and only a few requests are made at a
+time, so it doesn't slow down pasting.
+"""
+
+import concurrent.futures
+import sys
+import threading
+import time
+import traceback
+
+from pastetray import history
+
+# Set this to False to never check anything.
+enabled = True
+
+# These are in seconds.
+_START_DELAY = 60               # Let PasteTray start up first.
+_INTERVAL = 60 * 60
+_RECHECK_AFTER = 24 * 60 * 60
+_PRUNE_AFTER = 30 * 24 * 60 * 60
+
+# At most _CHECKERS HEAD requests are made at the same time, and at
+# most _REQUESTS_PER_SECOND are started every second. Only _BATCH
+# pastes are checked at a time.
+_CHECKERS = 4
+_REQUESTS_PER_SECOND = 2
+_BATCH = 100
+
+_thread = None
+
+
+class _RateLimiter:
+    """Make sure that things don't happen too often."""
+
+    def __init__(self, per_second):
+        self._interval = 1 / per_second
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleep until the next thing can be done."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def check():
+    """Update the history's dead pastes.
+
+    Dead pastes are removed after a month. This blocks until everything
+    is checked, so use start() instead of calling this in the main
+    thread.
+    """
+    # requests is slow to import, so this is not imported on startup.
+    from pastetray import connections
+
+    now = time.time()
+    history.mark_expired(now)
+    history.prune(now - _PRUNE_AFTER)
+
+    limiter = _RateLimiter(_REQUESTS_PER_SECOND)
+
+    def check_paste(paste):
+        limiter.wait()
+        return (paste.url, connections.is_gone(paste.url))
+
+    pastes = history.unchecked(now - _RECHECK_AFTER, _BATCH)
+    with concurrent.futures.ThreadPoolExecutor(_CHECKERS) as executor:
+        results = [(url, gone) for url, gone in
+                   executor.map(check_paste, pastes) if gone is not None]
+    history.set_checked(results, time.time())
+
+
+def _check_forever():
+    time.sleep(_START_DELAY)
+    while True:
+        try:
+            check()
+        except Exception:
+            # The next check may work, so the thread keeps running.
+            print("Checking expired pastes failed:", file=sys.stderr)
+            traceback.print_exc()
+        time.sleep(_INTERVAL)
+
+
+def start():
+    """Start checking the pastes every now and then in a thread."""
+    global _thread
+    if enabled and _thread is None:
+        _thread = threading.Thread(target=_check_forever)
+        _thread.daemon = True
+        _thread.start()
@@ -0,0 +1,225 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Read text files in the background.
+
+The file is read and decoded in a thread, and the text is given to the
+main thread in small pieces with GLib.idle_add(). Only a few
+milliseconds are spent on the pieces at a time, so GTK+ can redraw the
+windows between them.
+"""
+
+import codecs
+import collections
+import locale
+import os
+import tempfile
+import threading
+import time
+
+from gi.repository import GLib
+
+from pastetray import _, filepaths
+
+# The files are read in chunks of this many bytes.
+CHUNK_SIZE = 64 * 1024
+
+# This many seconds are spent on the chunks before letting GTK+ redraw.
+_FRAME_BUDGET = 0.008
+
+# The reading thread waits when this many chunks are waiting for the
+# main thread.
+_MAX_PENDING = 16
+
+# The UTF-32 BOMs must be checked before the UTF-16 BOMs because they
+# start with the same bytes.
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Text files may contain these control characters.
+_TEXT_CONTROLS = b'\t\n\r\f\v\x1b'
+_CONTROLS = bytes(byte for byte in range(32) if byte not in _TEXT_CONTROLS)
+
+# A file is binary if more than this part of its first chunk is control
+# characters.
+_MAX_CONTROLS = 0.1
+
+
+class BinaryFileError(ValueError):
+    """Raised when a file doesn't look like a text file."""
+
+
+def sniff_encoding(block):
+    """Return the encoding of a file that starts with a bytes object.
+
+    BinaryFileError is raised if the file doesn't look like text.
+    """
+    for bom, encoding in _BOMS:
+        if block.startswith(bom):
+            return encoding
+
+    controls = len(block) - len(block.translate(None, _CONTROLS))
+    if b'\0' in block or controls > len(block) * _MAX_CONTROLS:
+        raise BinaryFileError(_("This doesn't look like a text file."))
+
+    # The block may end in the middle of a character, and incremental
+    # decoders don't complain about that.
+    for encoding in ['utf-8', locale.getpreferredencoding(False)]:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(block)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    # Every byte is valid Latin-1.
+    return 'latin-1'
+
+
+class FileLoader:
+    """Read a text file in a background thread.
+
+    The callbacks are called in the main thread. Small files are given
+    to on_text in pieces, and on_done is called with None when the
+    whole file has been read or with an exception if reading it failed.
+    Files that are at least large_size bytes long are not read to
+    memory. Instead, on_large is called with a path to the file in
+    UTF-8 and True if the file is a temporary copy, and on_done is
+    called after that.
+    """
+
+    def __init__(self, path, large_size, on_text, on_large, on_done):
+        """Start loading."""
+        self._path = path
+        self._large_size = large_size
+        self._callbacks = {'text': on_text, 'large': on_large,
+                           'done': on_done}
+        self._pending = collections.deque()
+        self._lock = threading.Lock()
+        self._room = threading.Semaphore(_MAX_PENDING)
+        self._scheduled = False
+        self._cancelled = False
+
+        thread = threading.Thread(target=self._read)
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        """Stop loading without calling the callbacks anymore."""
+        self._cancelled = True
+        # Wake up the thread if it's waiting for room.
+        self._room.release()
+
+    def _put(self, kind, *args):
+        """Give something to the main thread.
+
+        This is called in the reading thread. Nothing is given after
+        cancel(), so this never waits for room that won't come.
+        """
+        if self._cancelled:
+            return
+        if kind == 'text':
+            self._room.acquire()
+            # cancel() releases the semaphore to wake up this thread.
+            if self._cancelled:
+                return
+        with self._lock:
+            self._pending.append((kind, args))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        GLib.idle_add(self._flush)
+
+    def _flush(self):
+        deadline = time.perf_counter() + _FRAME_BUDGET
+        while time.perf_counter() < deadline:
+            with self._lock:
+                if self._cancelled or not self._pending:
+                    self._scheduled = False
+                    return False
+                kind, args = self._pending.popleft()
+            if kind == 'text':
+                self._room.release()
+            self._callbacks[kind](*args)
+        # Let GTK+ redraw and continue later.
+        return True
+
+    def _read(self):
+        try:
+            with open(self._path, 'rb') as f:
+                first = f.read(CHUNK_SIZE)
+                encoding = sniff_encoding(first)
+                if os.fstat(f.fileno()).st_size >= self._large_size:
+                    self._read_large(f, first, encoding)
+                else:
+                    self._read_small(f, first, encoding)
+        except (OSError, BinaryFileError) as e:
+            self._put('done', e)
+        else:
+            self._put('done', None)
+
+    def _read_small(self, file, chunk, encoding):
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        while chunk and not self._cancelled:
+            # GTK+ doesn't like nul characters.
+            text = decoder.decode(chunk).replace('\0', '�')
+            self._put('text', text)
+            chunk = file.read(CHUNK_SIZE)
+        self._put('text', decoder.decode(b'', final=True))
+
+    def _is_utf8(self, file, chunk):
+        """Check if the rest of a file is valid UTF-8."""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            while chunk and not self._cancelled:
+                decoder.decode(chunk)
+                chunk = file.read(CHUNK_SIZE)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return False
+        return True
+
+    def _read_large(self, file, chunk, encoding):
+        if encoding == 'utf-8':
+            if self._is_utf8(file, chunk):
+                # The file can be used as is.
+                self._put('large', self._path, False)
+                return
+            # Only the first chunk was checked when the encoding was
+            # sniffed. Invalid bytes are replaced like in small files.
+            file.seek(0)
+            chunk = file.read(CHUNK_SIZE)
+
+        fd, temp_path = tempfile.mkstemp(suffix='.txt',
+                                         dir=filepaths.temp_dir)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        with open(fd, 'w', encoding='utf-8') as temp_file:
+            while chunk and not self._cancelled:
+                temp_file.write(decoder.decode(chunk))
+                chunk = file.read(CHUNK_SIZE)
+            temp_file.write(decoder.decode(b'', final=True))
+        if self._cancelled:
+            os.remove(temp_path)
+        else:
+            self._put('large', temp_path, True)
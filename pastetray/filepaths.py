@@ -21,6 +21,7 @@
 
 """The filepaths."""
 
+import atexit
 import functools
 import os
 import shutil
@@ -68,6 +69,7 @@ app = 'PasteTray' if sys.platform == 'win32' else 'pastetray'
 user_cache_dir = appdirs.user_cache_dir(app)
 user_config_dir = appdirs.user_config_dir(app)
 temp_dir = tempfile.mkdtemp(app)
+atexit.register(shutil.rmtree, temp_dir, ignore_errors=True)
 
 os.makedirs(user_cache_dir, exist_ok=True)
 os.makedirs(user_config_dir, exist_ok=True)
@@ -24,21 +24,55 @@
 from urllib.request import pathname2url
 import webbrowser
 
-from gi.repository import Gtk, GdkPixbuf
+from gi.repository import Gtk, GdkPixbuf, GLib
 from pkg_resources import resource_string
 
 import pastetray
-from pastetray import _, backend, new_paste, settings, trayicon
+from pastetray import (
+    _, backend, history, new_paste, outbox, profiling, settings, trayicon,
+    utils)
 from pastetray.filepaths import resource_filename, resource_listdir
 
 
+# The number of pastes from the history that are shown in the menu, and
+# in each "More..." submenu.
+_RECENT_PASTES = 10
+_MORE_PASTES = 25
+
+
 def make_new_paste(widget=None):
     """Make a new paste."""
-    postfuncs = backend.recent_pastes.appendleft, update_trayicon
-    pastewindow = new_paste.NewPasteWindow(postpaste_funcs=postfuncs)
+    # The paste is added to the history by backend.PasteGroup, and that
+    # updates the trayicon.
+    postfuncs = (_on_paste_succeeded,)
+    pastewindow = new_paste.get_window(postpaste_funcs=postfuncs)
     pastewindow.show()
 
 
+def paste_file(widget=None):
+    """Choose a file and make a new paste of it."""
+    dialog = Gtk.FileChooserDialog(
+        _("Paste file"), None, Gtk.FileChooserAction.OPEN, (
+            _("Cancel"), Gtk.ResponseType.CANCEL,
+            _("Open"), Gtk.ResponseType.ACCEPT,
+        ),
+    )
+    response = dialog.run()
+    path = dialog.get_filename()
+    dialog.destroy()
+    if response == Gtk.ResponseType.ACCEPT and path is not None:
+        postfuncs = (_on_paste_succeeded,)
+        pastewindow = new_paste.get_window(postpaste_funcs=postfuncs)
+        pastewindow.show()
+        # The window is shown while the file is loading.
+        pastewindow.load_file(path)
+
+
+def _on_paste_succeeded(url):
+    """The network works, so it's a good time to empty the outbox."""
+    outbox.wake()
+
+
 def change_settings(widget=None):
     """Open a window for changing the settings."""
     dialog = settings.SettingDialog()
@@ -48,7 +82,7 @@ def change_settings(widget=None):
 
 def clear_recent_pastes(widget=None):
     """Clear the recent paste list."""
-    if backend.recent_pastes:
+    if history.count():
         dialog = Gtk.MessageDialog(
             # Setting None as the transient parent is not recommended,
             # but this application has no main window.
@@ -65,8 +99,7 @@ def clear_recent_pastes(widget=None):
     response = dialog.run()
     dialog.destroy()
     if response == Gtk.ResponseType.YES:
-        backend.recent_pastes.clear()
-        update_trayicon()
+        history.clear()
 
 
 def show_help_page(widget=None):
@@ -90,11 +123,12 @@ def show_help_page(widget=None):
 
 # The license and logo are loaded here, because this way PasteTray
 # will not run without being able to display the about dialog.
-_license = resource_string('pastetray', 'doc/LICENSE')
-_license = _license.decode('utf-8')
+with profiling.timed("license and logo loading"):
+    _license = resource_string('pastetray', 'doc/LICENSE')
+    _license = _license.decode('utf-8')
 
-_logo = resource_filename('pastetray', 'icons/128x128.png')
-_logo = GdkPixbuf.Pixbuf.new_from_file(_logo)
+    _logo = resource_filename('pastetray', 'icons/128x128.png')
+    _logo = GdkPixbuf.Pixbuf.new_from_file(_logo)
 
 
 def show_about_dialog(widget=None):
@@ -120,6 +154,7 @@ def show_about_dialog(widget=None):
 def _menuitems():
     data = [
         (Gtk.STOCK_NEW, _("New paste"), make_new_paste),
+        (Gtk.STOCK_OPEN, _("Paste file..."), paste_file),
         (Gtk.STOCK_CLEAR, _("Clear recent pastes"), clear_recent_pastes),
         (Gtk.STOCK_PREFERENCES, _("Preferences"), change_settings),
         (Gtk.STOCK_HELP, _("Help"), show_help_page),
@@ -143,24 +178,99 @@ def _menuitems():
 _menuitems = dict(_menuitems())
 
 
-def update_trayicon(widget=None):
-    """Update the trayicon's content."""
-    for item in trayicon.menu.get_children():
-        # For some reason, sometimes this makes weird error messages.
-        trayicon.menu.remove(item)
+# The menu is built once, and after that only the items that change are
+# updated. These are the items that are not in _menuitems.
+_job_items = {}                 # These are job: item pairs.
+_paste_items = {}               # These are url: item pairs.
+_outbox_item = None
+_status_separator = None
+_no_pastes_item = None
+_more_item = None
+
+
+def _on_paste_queue_changed():
+    """Update the paste queue items in the main thread later.
+
+    This is called when the paste queue or the outbox changes.
+    """
+    GLib.idle_add(_update_status)
+
+
+def _on_history_changed():
+    """Update the recent pastes in the main thread later."""
+    GLib.idle_add(_update_history)
+
+backend.paste_queue.listeners.append(_on_paste_queue_changed)
+outbox.listeners.append(_on_paste_queue_changed)
+history.listeners.append(_on_history_changed)
+
+
+def _make_paste_item(number, paste):
+    """Return a menu item that opens a history.Paste in a web browser.
+
+    The item is grayed out if the paste has expired.
+    """
+    item = Gtk.MenuItem('{}. {}'.format(number, paste.url))
+    item.connect('activate', lambda i: webbrowser.open(paste.url))
+    item.set_sensitive(paste.dead is None)
+    item.show()
+    return item
+
+
+def _make_more_item(offset):
+    """Return a "More..." item with older pastes in a submenu.
+
+    The submenu shows _MORE_PASTES pastes starting at offset, and it's
+    filled when it's opened for the first time.
+    """
+    item = Gtk.MenuItem(_("More..."))
+    submenu = Gtk.Menu()
+    # GTK+ doesn't show an empty submenu.
+    placeholder = Gtk.MenuItem(_("Loading..."))
+    placeholder.set_sensitive(False)
+    submenu.add(placeholder)
+    submenu.show_all()
+    item.set_submenu(submenu)
+
+    def fill(widget):
+        if placeholder.get_parent() is None:
+            # It's filled already.
+            return
+        placeholder.destroy()
+        pastes = history.newest(_MORE_PASTES + 1, offset)
+        for number, paste in enumerate(pastes[:_MORE_PASTES],
+                                       start=offset+1):
+            submenu.add(_make_paste_item(number, paste))
+        if len(pastes) > _MORE_PASTES:
+            submenu.add(_make_more_item(offset + _MORE_PASTES))
+
+    # GTK+ selects the item when the mouse goes on it, and the
+    # AppIndicator activates it when the submenu is opened.
+    item.connect('select', fill)
+    item.connect('activate', fill)
+    item.show()
+    return item
+
+
+def _build_menu():
+    """Add the items that are always in the menu."""
+    global _outbox_item, _status_separator, _no_pastes_item
 
     trayicon.menu.add(_menuitems[Gtk.STOCK_NEW])
+    trayicon.menu.add(_menuitems[Gtk.STOCK_OPEN])
     trayicon.menu.add(Gtk.SeparatorMenuItem())
 
-    if backend.recent_pastes:
-        for number, url in enumerate(backend.recent_pastes, start=1):
-            item = Gtk.MenuItem('{}. {}'.format(number, url))
-            item.connect('activate', lambda i, url=url: webbrowser.open(url))
-            trayicon.menu.add(item)
-    else:
-        item = Gtk.MenuItem(_("(no pastes)"))
-        item.set_state(Gtk.StateType.INSENSITIVE)
-        trayicon.menu.add(item)
+    # The paste queue's items are added before this.
+    _outbox_item = Gtk.MenuItem()
+    _outbox_item.set_sensitive(False)
+    trayicon.menu.add(_outbox_item)
+    _status_separator = Gtk.SeparatorMenuItem()
+    trayicon.menu.add(_status_separator)
+
+    # The recent pastes are added before this.
+    _no_pastes_item = Gtk.MenuItem(_("(no pastes)"))
+    _no_pastes_item.set_sensitive(False)
+    trayicon.menu.add(_no_pastes_item)
     trayicon.menu.add(Gtk.SeparatorMenuItem())
 
     trayicon.menu.add(_menuitems[Gtk.STOCK_CLEAR])
@@ -170,3 +280,93 @@ def update_trayicon(widget=None):
     trayicon.menu.add(_menuitems[Gtk.STOCK_QUIT])
 
     trayicon.menu.show_all()
+
+
+def _position(item):
+    """Return the index of an item in the menu."""
+    return trayicon.menu.get_children().index(item)
+
+
+def _update_status():
+    """Show the jobs in the paste queue and the outbox."""
+    jobs = backend.paste_queue.jobs()
+    for job in list(_job_items):
+        if job not in jobs:
+            _job_items.pop(job).destroy()
+
+    for job in jobs:
+        if job.state == 'running':
+            text = _("Pasting to {} ({})")
+        else:
+            text = _("Waiting for {} ({})")
+        text = text.format(job.pastebin.name, utils.format_size(job.size))
+        try:
+            item = _job_items[job]
+        except KeyError:
+            item = _job_items[job] = Gtk.MenuItem(text)
+            item.set_sensitive(False)
+            trayicon.menu.insert(item, _position(_outbox_item))
+            item.show()
+        else:
+            if item.get_label() != text:
+                item.set_label(text)
+
+    waiting = outbox.count()
+    _outbox_item.set_label(
+        _("{} pastes will be sent later").format(waiting))
+    _outbox_item.set_visible(bool(waiting))
+    _status_separator.set_visible(bool(jobs or waiting))
+
+    # Don't run this again if this was called with GLib.idle_add().
+    return False
+
+
+def _update_history():
+    """Show the newest pastes in the history.
+
+    Items of pastes that are still shown are reused, so adding a paste
+    creates only one new item.
+    """
+    global _more_item
+
+    pastes = history.newest(_RECENT_PASTES + 1)
+    urls = [paste.url for paste in pastes[:_RECENT_PASTES]]
+    for url in list(_paste_items):
+        if url not in urls:
+            _paste_items.pop(url).destroy()
+
+    start = _position(_no_pastes_item) - len(_paste_items)
+    for number, paste in enumerate(pastes[:_RECENT_PASTES], start=1):
+        try:
+            item = _paste_items[paste.url]
+        except KeyError:
+            item = _paste_items[paste.url] = _make_paste_item(number, paste)
+            trayicon.menu.insert(item, start + number - 1)
+        else:
+            trayicon.menu.reorder_child(item, start + number - 1)
+            label = '{}. {}'.format(number, paste.url)
+            if item.get_label() != label:
+                item.set_label(label)
+            item.set_sensitive(paste.dead is None)
+    _no_pastes_item.set_visible(not urls)
+
+    # The old submenus may show pastes in the wrong places now.
+    if _more_item is not None:
+        _more_item.destroy()
+        _more_item = None
+    if len(pastes) > _RECENT_PASTES:
+        _more_item = _make_more_item(_RECENT_PASTES)
+        trayicon.menu.insert(_more_item, _position(_no_pastes_item) + 1)
+
+    return False
+
+
+def update_trayicon(widget=None):
+    """Update the trayicon's content."""
+    if _status_separator is None:
+        _build_menu()
+    _update_status()
+    _update_history()
+
+    # Don't run this again if this was called with GLib.idle_add().
+    return False
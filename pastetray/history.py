@@ -0,0 +1,262 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""The history of pastes.
+
+The history is stored in an SQLite database, and each paste is saved
+as soon as it's made. Unlike the old recent_pastes.txt file, the
+history is never rewritten, and it's not limited to a few pastes.
+"""
+
+import collections
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from pastetray import filepaths
+
+# Everything in listeners is called without arguments when the history
+# changes. They may be called in a background thread, so they must not
+# use GTK+ directly.
+listeners = []
+
+# The pastebin, expiry_days, size and title are None if they are not
+# known, e.g. for pastes that were made with an old PasteTray. The time
+# is in seconds since the epoch and the size is in bytes. dead is the
+# time when the paste was found to be expired, or None if it's alive.
+Paste = collections.namedtuple(
+    'Paste', 'url pastebin time expiry_days size title dead')
+
+_DB_PATH = os.path.join(filepaths.user_config_dir, 'history.sqlite')
+_OLD_PATH = os.path.join(filepaths.user_config_dir, 'recent_pastes.txt')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pastes (
+    url TEXT PRIMARY KEY,
+    host TEXT,
+    pastebin TEXT,
+    time REAL NOT NULL,
+    expiry_days INTEGER,
+    size INTEGER,
+    title TEXT COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS pastes_time ON pastes (time);
+CREATE INDEX IF NOT EXISTS pastes_host ON pastes (host, time);
+CREATE INDEX IF NOT EXISTS pastes_title ON pastes (title);
+'''
+
+# The database's user_version is the number of these that have been
+# run. Don't change them, add new ones instead.
+_MIGRATIONS = [
+    '''
+    ALTER TABLE pastes ADD COLUMN dead REAL;
+    ALTER TABLE pastes ADD COLUMN checked REAL;
+    CREATE INDEX pastes_unchecked ON pastes (checked)
+        WHERE expiry_days IS NULL AND dead IS NULL;
+    ''',
+]
+_COLUMNS = 'url, pastebin, time, expiry_days, size, title, dead'
+
+_connection = None
+_lock = threading.Lock()
+
+
+def _migrate_old_file():
+    """Move the pastes in recent_pastes.txt to the database.
+
+    The lock must be acquired when this is called.
+    """
+    try:
+        with open(_OLD_PATH, 'r') as f:
+            urls = [line.strip() for line in f if line.strip()]
+        mtime = os.path.getmtime(_OLD_PATH)
+    except FileNotFoundError:
+        return
+
+    # The file is newest first and it has no times, so the pastes get
+    # made-up times that keep them in the same order.
+    rows = [(url, urlparse(url).netloc, mtime - number)
+            for number, url in enumerate(urls)]
+    with _connection:
+        _connection.executemany(
+            'INSERT OR IGNORE INTO pastes (url, host, time) '
+            'VALUES (?, ?, ?)', reversed(rows))
+    os.remove(_OLD_PATH)
+
+
+def _migrate():
+    """Update an old database to the current format.
+
+    The lock must be acquired when this is called.
+    """
+    version = _connection.execute('PRAGMA user_version').fetchone()[0]
+    for number, script in enumerate(_MIGRATIONS[version:], start=version):
+        # executescript() commits, so the version is updated in the
+        # same script.
+        _connection.executescript(
+            'BEGIN; {} PRAGMA user_version = {}; COMMIT;'.format(
+                script, number + 1))
+
+
+def load():
+    """Open the database, creating it if needed."""
+    global _connection
+    with _lock:
+        # The connection is used in the main thread and the paste
+        # queue's worker threads, but never at the same time.
+        _connection = sqlite3.connect(_DB_PATH, check_same_thread=False)
+        _connection.executescript(_SCHEMA)
+        _migrate()
+        _migrate_old_file()
+
+
+def _notify_listeners():
+    for listener in listeners:
+        listener()
+
+
+def add(url, pastebin=None, expiry_days=None, size=None, title=None):
+    """Add a paste to the history and save it right away.
+
+    If the URL is in the history already, it's moved to the top. This
+    can be called from any thread.
+    """
+    with _lock, _connection:
+        _connection.execute(
+            'INSERT OR REPLACE INTO pastes (url, host, pastebin, time, '
+            'expiry_days, size, title) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (url, urlparse(url).netloc, pastebin, time.time(),
+             expiry_days, size, title or None))
+    _notify_listeners()
+
+
+def _query(sql, args):
+    with _lock:
+        cursor = _connection.execute(sql, args)
+        return [Paste(*row) for row in cursor]
+
+
+def newest(count, offset=0):
+    """Return a list of at most count Paste objects, newest first.
+
+    The first offset pastes are skipped.
+    """
+    return _query('SELECT {} FROM pastes ORDER BY time DESC '
+                  'LIMIT ? OFFSET ?'.format(_COLUMNS), (count, offset))
+
+
+def search(title=None, host=None, since=None, until=None, limit=-1):
+    """Return a list of matching Paste objects, newest first.
+
+    The title is matched case-insensitively as a prefix, the host must
+    be equal to the URL's host, like 'dpaste.com', and since and until
+    are times in seconds since the epoch. None matches everything.
+    """
+    conditions = []
+    args = []
+    if title is not None:
+        # Without escaping, % and _ in the title would be wildcards.
+        escaped = (title.replace('\\', '\\\\').replace('%', '\\%')
+                   .replace('_', '\\_'))
+        conditions.append("title LIKE ? ESCAPE '\\'")
+        args.append(escaped + '%')
+    if host is not None:
+        conditions.append('host = ?')
+        args.append(host)
+    if since is not None:
+        conditions.append('time >= ?')
+        args.append(since)
+    if until is not None:
+        conditions.append('time < ?')
+        args.append(until)
+
+    sql = 'SELECT {} FROM pastes'.format(_COLUMNS)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY time DESC LIMIT ?'
+    return _query(sql, args + [limit])
+
+
+def count():
+    """Return the number of pastes in the history."""
+    with _lock:
+        return _connection.execute('SELECT COUNT(*) FROM pastes').fetchone()[0]
+
+
+def clear():
+    """Remove all pastes from the history."""
+    with _lock, _connection:
+        _connection.execute('DELETE FROM pastes')
+    _notify_listeners()
+
+
+def mark_expired(now):
+    """Mark pastes whose expiry_days have passed as dead.
+
+    now should be the current time in seconds since the epoch. Pastes
+    without a known expiry are not changed.
+    """
+    with _lock, _connection:
+        changed = _connection.execute(
+            'UPDATE pastes SET dead = ? WHERE dead IS NULL AND '
+            'expiry_days >= 0 AND time + expiry_days * 86400 < ?',
+            (now, now)).rowcount
+    if changed:
+        _notify_listeners()
+
+
+def unchecked(checked_before, limit):
+    """Return a list of at most limit pastes that should be checked.
+
+    These are pastes without a known expiry that have not been checked
+    since checked_before, least recently checked first.
+    """
+    return _query('SELECT {} FROM pastes WHERE expiry_days IS NULL AND '
+                  'dead IS NULL AND (checked IS NULL OR checked < ?) '
+                  'ORDER BY checked LIMIT ?'.format(_COLUMNS),
+                  (checked_before, limit))
+
+
+def set_checked(results, now):
+    """Save the results of checking pastes.
+
+    results should be a list of (url, dead) pairs, where dead is True
+    if the paste has expired.
+    """
+    if not results:
+        return
+    with _lock, _connection:
+        _connection.executemany(
+            'UPDATE pastes SET checked = ?, dead = ? WHERE url = ?',
+            [(now, now if dead else None, url) for url, dead in results])
+    if any(dead for url, dead in results):
+        _notify_listeners()
+
+
+def prune(dead_before):
+    """Remove pastes that have been dead since before dead_before."""
+    with _lock, _connection:
+        changed = _connection.execute(
+            'DELETE FROM pastes WHERE dead < ?', (dead_before,)).rowcount
+    if changed:
+        _notify_listeners()
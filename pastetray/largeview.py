@@ -0,0 +1,293 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""A read-only view of big pastes.
+
+GTK+ lays out all text in a Gtk.TextView, and that's slow when the
+text is many megabytes long, especially with line wrapping. LargeView
+keeps the content in a file and puts only the lines that are on the
+screen to the text view.
+"""
+
+import array
+import bisect
+import threading
+
+from gi.repository import Gdk, Gtk, GLib
+
+from pastetray import _, utils
+
+# The line index remembers how many lines there are before each block
+# of this many bytes.
+_BLOCK_SIZE = 16 * 1024
+
+# This many lines are put to the text view at a time. It should be more
+# than fits on any screen.
+_VISIBLE_LINES = 150
+
+# Longer lines are cut when they are displayed.
+_MAX_LINE_LENGTH = 2000
+
+# The line count is updated after reading this many bytes.
+_PROGRESS_INTERVAL = 8 * 1024 * 1024
+
+# This many lines are scrolled with one turn of the mouse wheel.
+_SCROLL_LINES = 3
+
+
+class LineIndex:
+    """Find lines in a big file without reading all of it.
+
+    The file is indexed in a background thread, and the callback is
+    called with the index as the only argument in that thread every now
+    and then while indexing and when the indexing is done.
+    """
+
+    def __init__(self, path, callback):
+        """Start indexing the file."""
+        self.path = path
+        self.size = 0           # The number of bytes indexed so far.
+        self.done = False
+        self._newlines = 0
+        self._last_byte = b''
+        self._block_lines = array.array('q')
+        self._callback = callback
+        self._stopped = False
+
+        thread = threading.Thread(target=self._build)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """Stop indexing."""
+        self._stopped = True
+
+    def _build(self):
+        next_progress = _PROGRESS_INTERVAL
+        with open(self.path, 'rb') as f:
+            while not self._stopped:
+                block = f.read(_BLOCK_SIZE)
+                if not block:
+                    break
+                self._block_lines.append(self._newlines)
+                self._newlines += block.count(b'\n')
+                self._last_byte = block[-1:]
+                self.size += len(block)
+                if self.size >= next_progress:
+                    next_progress += _PROGRESS_INTERVAL
+                    self._callback(self)
+        self.done = True
+        self._callback(self)
+
+    @property
+    def lines(self):
+        """The number of lines indexed so far."""
+        if self._last_byte in (b'', b'\n'):
+            return self._newlines
+        # The last line doesn't end with a newline.
+        return self._newlines + 1
+
+    def _offset(self, line):
+        """Return the byte offset where a line starts or None."""
+        if line == 0:
+            return 0
+        if line > self._newlines:
+            return None
+
+        # The last block that starts before the line.
+        block = bisect.bisect_left(self._block_lines, line) - 1
+        skip = line - self._block_lines[block]
+        position = block * _BLOCK_SIZE
+        with open(self.path, 'rb') as f:
+            f.seek(position)
+            while True:
+                data = f.read(_BLOCK_SIZE)
+                if not data:
+                    return None
+                start = 0
+                while skip:
+                    found = data.find(b'\n', start)
+                    if found < 0:
+                        break
+                    skip -= 1
+                    start = found + 1
+                if not skip:
+                    return position + start
+                position += len(data)
+
+    def read_lines(self, first, count):
+        """Return a list of at most count lines as strings.
+
+        Very long lines are cut.
+        """
+        offset = self._offset(first)
+        if offset is None:
+            return []
+
+        result = []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(result) < count:
+                line = f.readline(_MAX_LINE_LENGTH)
+                if not line:
+                    break
+                if line.endswith(b'\n'):
+                    line = line[:-1]
+                elif len(line) == _MAX_LINE_LENGTH:
+                    # Skip the rest of the line.
+                    rest = line
+                    while rest and not rest.endswith(b'\n'):
+                        rest = f.readline(_BLOCK_SIZE)
+                    line += b' [...]'
+                result.append(line.decode('utf-8', errors='replace'))
+        return result
+
+
+def read_sample(path, size):
+    """Return (head, tail) strings of a file for detect.guess()."""
+    with open(path, 'rb') as f:
+        head = f.read(size)
+        f.seek(0, 2)
+        end = f.tell()
+        tail = b''
+        if end > 2 * size:
+            f.seek(end - size)
+            tail = f.read(size)
+    return (head.decode('utf-8', errors='replace'),
+            tail.decode('utf-8', errors='replace'))
+
+
+class LargeView:
+    """Show a big UTF-8 file in a Gtk.TextView."""
+
+    def __init__(self, textview, scrollbar, label):
+        """Initialize the view.
+
+        The textview should be in a Gtk.ScrolledWindow, and the
+        scrollbar and label are shown when a file is opened.
+        """
+        self._textview = textview
+        self._scrollbar = scrollbar
+        self._label = label
+        self._adjustment = Gtk.Adjustment()
+        self._adjustment.connect('value-changed', self._on_scrolled)
+        scrollbar.set_adjustment(self._adjustment)
+        textview.add_events(Gdk.EventMask.SCROLL_MASK |
+                            Gdk.EventMask.SMOOTH_SCROLL_MASK)
+        textview.connect('scroll-event', self._on_scroll_event)
+        self._index = None
+        self._top = 0
+        self._old_state = None
+
+    @property
+    def active(self):
+        """True if a file is opened."""
+        return self._index is not None
+
+    def open(self, path):
+        """Show a file."""
+        if self.active:
+            self.close()
+        scrolledwindow = self._textview.get_parent()
+        self._old_state = (self._textview.get_editable(),
+                           self._textview.get_wrap_mode(),
+                           scrolledwindow.get_policy())
+
+        # Wrapping would need to look at all lines.
+        self._textview.set_editable(False)
+        self._textview.set_wrap_mode(Gtk.WrapMode.NONE)
+        # The scrollbar of the view is used instead of the scrolled
+        # window's vertical scrollbar. PolicyType.EXTERNAL is new in
+        # GTK+ 3.16.
+        policy = getattr(Gtk.PolicyType, 'EXTERNAL', Gtk.PolicyType.NEVER)
+        scrolledwindow.set_policy(Gtk.PolicyType.AUTOMATIC, policy)
+        self._scrollbar.show()
+        self._label.show()
+
+        self._top = 0
+        self._index = LineIndex(path, self._on_index_progress)
+        self._update_label(self._index)
+
+    def close(self):
+        """Stop showing the file and clear the text view."""
+        if not self.active:
+            return
+        self._index.stop()
+        self._textview.get_buffer().set_text('')
+        self._index = None
+
+        editable, wrap_mode, (hpolicy, vpolicy) = self._old_state
+        self._textview.set_editable(editable)
+        self._textview.set_wrap_mode(wrap_mode)
+        self._textview.get_parent().set_policy(hpolicy, vpolicy)
+        self._scrollbar.hide()
+        self._label.hide()
+
+    def _on_index_progress(self, index):
+        # This is called in the indexing thread, and self._index may
+        # have changed already.
+        GLib.idle_add(self._update_label, index)
+
+    def _update_label(self, index):
+        if self._index is None or index is not self._index:
+            # The view has been closed or another file has been opened.
+            return False
+
+        lines = index.lines
+        page = min(lines, _VISIBLE_LINES // 5)
+        value = min(self._adjustment.get_value(), max(lines - page, 0))
+        self._adjustment.configure(value, 0, lines, 1, page, page)
+
+        text = _("Read-only view of a big paste: {} lines, {}").format(
+            lines, utils.format_size(index.size))
+        if not index.done:
+            text += " " + _("(still counting)")
+        self._label.set_text(text)
+
+        # The first lines may have been indexed now.
+        self._render()
+        return False
+
+    def _on_scrolled(self, adjustment):
+        top = int(adjustment.get_value())
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _on_scroll_event(self, textview, event):
+        if not self.active:
+            return False
+        if event.direction == Gdk.ScrollDirection.UP:
+            delta = -1
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            delta = 1
+        elif event.direction == Gdk.ScrollDirection.SMOOTH:
+            delta = event.get_scroll_deltas()[2]
+        else:
+            return False
+        self._adjustment.set_value(self._adjustment.get_value() +
+                                   delta * _SCROLL_LINES)
+        return True
+
+    def _render(self):
+        """Put the lines at the top of the view to the text view."""
+        lines = self._index.read_lines(self._top, _VISIBLE_LINES)
+        self._textview.get_buffer().set_text('\n'.join(lines))
@@ -22,54 +22,91 @@
 """A new paste window."""
 
 import os
+import tempfile
+import threading
 import webbrowser
 
 from gi.repository import Gtk, GLib
 from pkg_resources import resource_string
 
-from pastetray import _, backend, utils
+from pastetray import (_, backend, detect, fileloader, filepaths, largeview,
+                       outbox, sources, syntaxes, utils)
 from pastetray.settings import settings
 
+# The progress bar is only an animation, so it doesn't need to be moved
+# often. This is in milliseconds.
+_PULSE_INTERVAL = 200
+
+# The syntax is guessed when the content hasn't changed for this many
+# milliseconds.
+_DETECT_DELAY = 500
+
+# The info of dropped files in the text view's drag-and-drop targets.
+_URI_INFO = 1000
+
+# This many hidden windows are kept for get_window().
+_POOL_SIZE = 1
+
+_pool = []
+_glade = None
+
 
 @utils.debug_class
 class NewPasteWindow:
     """Make a new paste."""
 
-    def __init__(self, postpaste_funcs=()):
-        """Initialize the window.
+    def __init__(self):
+        """Create the widgets.
 
-        If pasting succeeds, everything in postpaste_funcs will be
-        called with the paste URL as the only argument.
+        The window must be reset() before it's shown. Use get_window()
+        instead of creating NewPasteWindows directly.
         """
-        self._postpaste_funcs = postpaste_funcs
+        self._detect_source = None
+        self._detect_number = 0
+        self._pasting = False
+        self._large_path = None
+        self._large_is_temporary = False
+        self._large_number = 0
+        self._loader = None
+        # This is a copy of the text buffer's content, so pasting
+        # doesn't need to get all of the text from GTK+.
+        self._mirror = sources.PieceList()
 
         self._builder = Gtk.Builder()
-        data = resource_string('pastetray', 'new-paste.glade')
-        self._builder.add_from_string(data.decode('utf-8'))
+        self._builder.add_from_string(_get_glade())
 
         get = self._builder.get_object
 
-        wrap = settings.get_int('General', 'new_paste_wrap')
-        font = settings.get_font('General', 'new_paste_font')
-        get('textview').set_wrap_mode(wrap)
-        get('textview').override_font(font)
-
         get('username-label').set_text(_("Name or nick:"))
         get('pastebin-label').set_text(_("Pastebin:"))
         get('expiry-label').set_text(_("Expiry:"))
         get('syntax-label').set_text(_("Syntax highlighting:"))
 
-        username = settings.get_string('General', 'username',
-                                       fallback=os.getlogin())
-        get('username-entry').set_text(username)
-
-        pastebin_names = sorted(backend.pastebins.keys(), key=str.lower)
-        pastebin_default = settings.get_string('General', 'default_pastebin',
-                                               fallback=pastebin_names[0])
-        index = pastebin_names.index(pastebin_default)
-        for name in pastebin_names:
-            get('pastebin-combo').append_text(name)
-        get('pastebin-combo').set_active(index)
+        self._pastebin_names = sorted(backend.pastebins.keys(),
+                                      key=str.lower)
+        for name in self._pastebin_names:
+            # The id is the name and the text may be changed later.
+            get('pastebin-combo').append(name, name)
+
+        # The fanout menu is for pasting to more than one pastebin at
+        # the same time.
+        fanout_menu = Gtk.Menu()
+        self._fanout_items = {}
+        for name in self._pastebin_names:
+            item = Gtk.CheckMenuItem(name)
+            fanout_menu.append(item)
+            self._fanout_items[name] = item
+        fanout_menu.append(Gtk.SeparatorMenuItem())
+        self._first_success_item = Gtk.RadioMenuItem.new_with_label(
+            None, _("Keep only the fastest paste"))
+        self._all_item = Gtk.RadioMenuItem.new_with_label_from_widget(
+            self._first_success_item, _("Keep all pastes"))
+        fanout_menu.append(self._first_success_item)
+        fanout_menu.append(self._all_item)
+        self._first_success_item.connect('toggled', self._on_policy_changed)
+        fanout_menu.show_all()
+        get('fanout-button').set_popup(fanout_menu)
+        get('fanout-button').set_label(_("Also paste to"))
 
         self._expiry_model = Gtk.ListStore(int, str)
         get('expiry-combo').set_model(self._expiry_model)
@@ -82,29 +119,133 @@ class NewPasteWindow:
             _("No syntax highlighting named {!r}"),
         )
 
+        self._large_view = largeview.LargeView(
+            get('textview'), get('large-scrollbar'), get('large-label'))
+
         get('window').set_title(_("New paste") + " - PasteTray")
 
         get('pastebin-combo').connect('changed', self._on_pastebin_changed)
         get('expiry-combo').connect('changed', self._on_expiry_changed)
         get('syntax-entry').connect('changed', self._on_syntax_changed)
+        get('textview').get_buffer().connect('changed',
+                                             self._on_text_changed)
+        get('textview').get_buffer().connect('insert-text',
+                                             self._on_insert_text)
+        # _on_insert_text() may stop the signal, and the text is
+        # inserted only if it doesn't.
+        get('textview').get_buffer().connect_after('insert-text',
+                                                   self._on_text_inserted)
+        get('textview').get_buffer().connect('delete-range',
+                                             self._on_range_deleted)
+        # Dropped files are loaded with load_file(). The URI targets are
+        # first, so file managers don't drop the file names as text.
+        targets = Gtk.TargetList.new([])
+        targets.add_uri_targets(_URI_INFO)
+        targets.add_text_targets(0)
+        get('textview').drag_dest_set_target_list(targets)
+        get('textview').connect('drag-data-received',
+                                self._on_drag_data_received)
         get('paste-button').connect('clicked', self._on_paste_clicked)
-        get('cancel-button').connect('clicked', self._destroy)
-        get('window').connect('delete-event', self._destroy)
+        get('cancel-button').connect('clicked', self._close)
+        get('window').connect('delete-event', self._close)
+
+    def reset(self, postpaste_funcs=()):
+        """Make the window look like a new window.
+
+        If pasting succeeds, everything in postpaste_funcs will be
+        called with the paste URL as the only argument.
+        """
+        self._postpaste_funcs = postpaste_funcs
+
+        # The guessed syntax is used until the user chooses a syntax.
+        self._syntax_chosen = False
+        self._detected_lexer = None
+        self._pastebin_name = None      # See _on_pastebin_changed().
+        self._filename = None           # The name of a loaded file.
+
+        get = self._builder.get_object
+
+        self._stop_loading()
+        self._close_large()
+        wrap = settings.get_int('General', 'new_paste_wrap')
+        font = settings.get_font('General', 'new_paste_font')
+        get('textview').set_wrap_mode(wrap)
+        get('textview').set_editable(True)
+        get('textview').override_font(font)
+
+        buf = get('textview').get_buffer()
+        with utils.blocked(buf, self._on_text_changed):
+            buf.set_text('')
+        get('title-entry').set_text('')
+        username = settings.get_string('General', 'username',
+                                       fallback=os.getlogin())
+        get('username-entry').set_text(username)
 
+        for item in self._fanout_items.values():
+            item.set_active(False)
+        with utils.blocked(self._first_success_item,
+                           self._on_policy_changed):
+            if settings.get_string('General', 'fanout_policy') == 'all':
+                self._all_item.set_active(True)
+            else:
+                self._first_success_item.set_active(True)
+
+        pastebin_default = settings.get_string(
+            'General', 'default_pastebin',
+            fallback=self._pastebin_names[0])
+        index = self._pastebin_names.index(pastebin_default)
+        with utils.blocked(get('pastebin-combo'), self._on_pastebin_changed):
+            get('pastebin-combo').set_active(index)
+        self._update_pastebin_labels()
+        get('progressbar').set_fraction(0)
         self._on_pastebin_changed()
 
     def show(self):
         """Show the window and all widgets inside it."""
         self._builder.get_object('window').show_all()
+        # The user will probably paste to the pastebin soon.
+        backend.prewarm(backend.pastebins[self._get_pastebin_name()])
 
     def _get_pastebin_name(self):
         """Return the name of currently selected pastebin."""
-        return self._builder.get_object('pastebin-combo').get_active_text()
+        return self._builder.get_object('pastebin-combo').get_active_id()
+
+    def _update_pastebin_labels(self):
+        """Mark the pastebins that have been failing in the combobox."""
+        # Gtk.ComboBoxText's model has the texts in column 0 and the ids
+        # in column 1.
+        for row in self._builder.get_object('pastebin-combo').get_model():
+            name = row[1]
+            if backend.is_degraded(backend.pastebins[name]):
+                row[0] = _("{} (not responding)").format(name)
+            else:
+                row[0] = name
+
+    def _get_pastebins(self):
+        """Return a list of pastebins to paste to.
+
+        The selected pastebin is first.
+        """
+        selected = self._get_pastebin_name()
+        result = [backend.pastebins[selected]]
+        for name, item in sorted(self._fanout_items.items()):
+            if name != selected and item.get_active():
+                result.append(backend.pastebins[name])
+        return result
+
+    def _get_policy(self):
+        """Return the backend.PasteGroup policy for pasting."""
+        if self._first_success_item.get_active():
+            return backend.PasteGroup.FIRST_SUCCESS
+        return backend.PasteGroup.ALL
 
     def _get_content(self):
-        """Return the content to paste."""
-        buf = self._builder.get_object('textview').get_buffer()
-        return buf.get_text(buf.get_start_iter(), buf.get_end_iter(), True)
+        """Return the content to paste as a sources.ContentSource."""
+        if self._large_path is not None:
+            # Big pastes are sent straight from the file.
+            return sources.ContentSource(path=self._large_path)
+        # The snapshot doesn't change when the text is edited later.
+        return sources.ContentSource(pieces=self._mirror.snapshot())
 
     def _get_expiry(self):
         """Return currently selected expiry."""
@@ -156,6 +297,14 @@ class NewPasteWindow:
         pastebin = backend.pastebins[pastebin_name]
         get = self._builder.get_object
 
+        # Hidden windows are prewarmed when they are shown.
+        if get('window').get_visible():
+            backend.prewarm(pastebin)
+
+        # The selected pastebin is always pasted to.
+        for name, item in self._fanout_items.items():
+            item.set_sensitive(name != pastebin_name)
+
         if 'syntax' in pastebin.paste_args:
             completions = pastebin.syntax_choices.keys()
             self._syntax_completion.set_completions(completions)
@@ -163,9 +312,13 @@ class NewPasteWindow:
                                          fallback=None)
             if syntax not in pastebin.syntax_choices.keys():
                 syntax = pastebin.syntax_default
+            carried = self._convert_chosen_syntax(pastebin)
+            if carried is not None:
+                syntax = carried
             with utils.blocked(get('syntax-entry'), self._on_syntax_changed):
                 get('syntax-entry').set_text(syntax)
             self._syntax_completion.on_entry_changed()
+            self._apply_detected_syntax()
 
         default_expiry = settings.get_string('DefaultExpiry', pastebin_name,
                                              fallback=None)
@@ -190,15 +343,38 @@ class NewPasteWindow:
         )
 
         self._make_sensitive()
+        self._pastebin_name = pastebin_name
+
+    def _convert_chosen_syntax(self, pastebin):
+        """Return the chosen syntax's name in another pastebin or None.
+
+        This is called when the pastebin changes, before the new
+        pastebin's syntax is set to the entry.
+        """
+        if not self._syntax_chosen or self._pastebin_name is None:
+            return None
+        old_pastebin = backend.pastebins[self._pastebin_name]
+        if 'syntax' not in old_pastebin.paste_args:
+            return None
+        syntax_name = self._builder.get_object('syntax-entry').get_text()
+        syntax_id = old_pastebin.syntax_choices.get(syntax_name)
+        if syntax_id is None:
+            return None
+        return syntaxes.find_name(syntax_id, pastebin)
 
     def _on_expiry_changed(self, widget):
         """Set the default expiry to settings."""
         settings.set_int('DefaultExpiry', self._get_pastebin_name(),
                          self._get_expiry())
 
+    def _on_policy_changed(self, widget):
+        """Set the new fanout policy to settings."""
+        settings.set_string('General', 'fanout_policy', self._get_policy())
+
     def _on_syntax_changed(self, widget):
         """Set the new default syntax to settings."""
         get = self._builder.get_object
+        self._syntax_chosen = True
         self._syntax_completion.on_entry_changed()
 
         # The _get_syntax() method returns a pastebin.syntax_choices
@@ -206,10 +382,228 @@ class NewPasteWindow:
         settings.set_string('DefaultSyntax', self._get_pastebin_name(),
                             get('syntax-entry').get_text())
 
+    def _on_insert_text(self, textbuffer, location, text, length):
+        """Show big pastes with a largeview.LargeView."""
+        if self._large_view.active:
+            # The large view is putting lines to the buffer.
+            return
+        limit = settings.get_int('General', 'large_paste_size')
+        if textbuffer.get_char_count() + len(text) < limit:
+            return
+
+        # GTK+ would need a long time to lay out all of the text.
+        textbuffer.stop_emission_by_name('insert-text')
+        before = textbuffer.get_text(textbuffer.get_start_iter(),
+                                     location, True)
+        after = textbuffer.get_text(location, textbuffer.get_end_iter(),
+                                    True)
+        self._write_large_text(before + text + after)
+
+    def _on_text_inserted(self, textbuffer, location, text, length):
+        """Update the mirror after inserting text."""
+        if self._large_view.active:
+            # The large view is putting lines to the buffer.
+            return
+        # The location is at the end of the inserted text now.
+        self._mirror.insert(location.get_offset() - len(text), text)
+
+    def _on_range_deleted(self, textbuffer, start, end):
+        """Update the mirror before deleting text."""
+        if self._large_view.active:
+            return
+        self._mirror.delete(start.get_offset(), end.get_offset())
+
+    def _write_large_text(self, text):
+        """Write text to a temporary file and show it in the large view."""
+        fd, path = tempfile.mkstemp(suffix='.txt', dir=filepaths.temp_dir)
+        self._large_number += 1
+        number = self._large_number
+
+        def write():
+            with open(fd, 'w', encoding='utf-8') as f:
+                for start in range(0, len(text), sources.CHUNK_SIZE):
+                    f.write(text[start:start+sources.CHUNK_SIZE])
+            GLib.idle_add(self._on_large_text_written, number, path)
+
+        thread = threading.Thread(target=write)
+        thread.daemon = True
+        thread.start()
+
+    def _on_large_text_written(self, number, path):
+        if number == self._large_number:
+            self.open_large_file(path, temporary=True)
+        else:
+            # The window has been reset while writing.
+            os.remove(path)
+        return False
+
+    def open_large_file(self, path, temporary=False):
+        """Show a big UTF-8 file instead of the text in the text view.
+
+        The file is pasted without reading all of it to memory, and it's
+        removed when the window is reset if temporary is True.
+        """
+        self._close_large()
+        self._large_number += 1
+        self._large_path = path
+        self._large_is_temporary = temporary
+
+        # The mirror isn't updated while the large view is active, so
+        # it must be empty like the buffer will be after the view.
+        buf = self._builder.get_object('textview').get_buffer()
+        with utils.blocked(buf, self._on_text_changed):
+            buf.set_text('')
+        self._large_view.open(path)
+        self._on_text_changed()
+
+    def _close_large(self):
+        """Go back to the normal text view."""
+        # Files that are still being written are removed when they are
+        # done.
+        self._large_number += 1
+        if self._large_path is None:
+            return
+        self._large_view.close()
+        if self._large_is_temporary:
+            try:
+                os.remove(self._large_path)
+            except OSError:
+                pass
+        self._large_path = None
+
+    def load_file(self, path):
+        """Replace the content with a text file.
+
+        The file is loaded in the background.
+        """
+        textview = self._builder.get_object('textview')
+        buf = textview.get_buffer()
+        self._stop_loading()
+        self._close_large()
+        buf.set_text('')
+        self._filename = os.path.basename(path)
+
+        # Typing while loading would mix the text with the file.
+        textview.set_editable(False)
+        self._loader = fileloader.FileLoader(
+            path, settings.get_int('General', 'large_paste_size'),
+            lambda text: buf.insert(buf.get_end_iter(), text),
+            self.open_large_file, self._on_file_loaded)
+
+    def _stop_loading(self):
+        """Stop load_file() if it's running."""
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+            self._builder.get_object('textview').set_editable(True)
+
+    def _on_file_loaded(self, error):
+        """Show an error message if loading a file failed."""
+        self._loader = None
+        textview = self._builder.get_object('textview')
+        if not self._large_view.active:
+            textview.set_editable(True)
+            buf = textview.get_buffer()
+            buf.place_cursor(buf.get_start_iter())
+        if error is None:
+            return
+
+        dialog = Gtk.MessageDialog(
+            self._builder.get_object('window'), Gtk.DialogFlags.MODAL,
+            Gtk.MessageType.ERROR, Gtk.ButtonsType.OK,
+            _("Cannot paste {}").format(self._filename),
+        )
+        dialog.set_title(_("Error"))
+        dialog.format_secondary_text(str(error))
+        dialog.run()
+        dialog.destroy()
+
+    def _on_drag_data_received(self, textview, context, x, y, data, info,
+                               time):
+        """Load a file that is dropped on the text view."""
+        if info != _URI_INFO:
+            # It's text, and the text view takes care of it.
+            return
+        textview.stop_emission_by_name('drag-data-received')
+        uris = data.get_uris()
+        try:
+            path = GLib.filename_from_uri(uris[0])[0]
+        except (IndexError, GLib.Error):
+            # Not a local file.
+            Gtk.drag_finish(context, False, False, time)
+            return
+        Gtk.drag_finish(context, True, False, time)
+        self.load_file(path)
+
+    def _on_text_changed(self, textbuffer=None):
+        """Guess the syntax later if the user hasn't chosen it."""
+        if self._large_view.active and textbuffer is not None:
+            # The large view changed the visible lines.
+            return
+        if self._syntax_chosen or not settings.get_bool('General',
+                                                        'detect_syntax'):
+            return
+        if self._detect_source is not None:
+            GLib.source_remove(self._detect_source)
+        self._detect_source = GLib.timeout_add(_DETECT_DELAY,
+                                               self._start_detecting)
+
+    def _start_detecting(self):
+        """Start guessing the syntax in a background thread."""
+        self._detect_source = None
+        buf = self._builder.get_object('textview').get_buffer()
+        count = buf.get_char_count()
+        if self._large_path is not None:
+            try:
+                head, tail = largeview.read_sample(self._large_path,
+                                                   detect.SAMPLE_SIZE)
+            except OSError:
+                return False
+        elif count <= 2 * detect.SAMPLE_SIZE:
+            head = buf.get_text(buf.get_start_iter(), buf.get_end_iter(),
+                                True)
+            tail = ''
+        else:
+            # Getting the whole text would be slow for big pastes.
+            head = buf.get_text(buf.get_start_iter(),
+                                buf.get_iter_at_offset(detect.SAMPLE_SIZE),
+                                True)
+            tail = buf.get_text(
+                buf.get_iter_at_offset(count - detect.SAMPLE_SIZE),
+                buf.get_end_iter(), True)
+
+        # Only the newest guess is used.
+        self._detect_number += 1
+        number = self._detect_number
+        detect.guess_later(
+            head, tail, self._filename, lambda lexer: GLib.idle_add(
+                self._on_syntax_detected, number, lexer))
+        return False
+
+    def _on_syntax_detected(self, number, lexer):
+        """Use a guessed syntax."""
+        if number == self._detect_number:
+            self._detected_lexer = lexer
+            self._apply_detected_syntax()
+        return False
+
+    def _apply_detected_syntax(self):
+        """Select the guessed syntax if the user hasn't chosen one."""
+        if self._syntax_chosen or self._detected_lexer is None:
+            return
+        pastebin = backend.pastebins[self._get_pastebin_name()]
+        if 'syntax' not in pastebin.paste_args:
+            return
+        syntax = detect.find_syntax(self._detected_lexer, pastebin)
+        if syntax is not None:
+            entry = self._builder.get_object('syntax-entry')
+            with utils.blocked(entry, self._on_syntax_changed):
+                entry.set_text(syntax)
+            self._syntax_completion.on_entry_changed()
+
     def _on_paste_clicked(self, widget):
         """Run when user clicks the paste button."""
         self._make_insensitive()
-        pastebin = backend.pastebins[self._get_pastebin_name()]
         getters = {
             'content': self._get_content,
             'expiry': self._get_expiry,
@@ -217,25 +611,60 @@ class NewPasteWindow:
             'title': self._builder.get_object('title-entry').get_text,
             'username': self._builder.get_object('username-entry').get_text,
         }
-        pasting_thread = backend.PastingThread(pastebin, getters)
-        pasting_thread.daemon = True
-        pasting_thread.start()
-        GLib.timeout_add(50, self._on_timeout, pasting_thread)
+        pastebins = self._get_pastebins()
+        if settings.get_bool('General', 'failover'):
+            order = settings.get_string('General', 'failover_order')
+            order = [name.strip() for name in order.split(',')]
+            failover = backend.failover_pastebins(pastebins[0], order)
+        else:
+            failover = []
+        self._requested_pastebins = pastebins
+        self._pasting = True
+        self._paste_group = backend.start_pasting(
+            pastebins, getters, self._on_pasting_done,
+            self._get_policy(), failover)
+        self._pulse_source = GLib.timeout_add(_PULSE_INTERVAL, self._pulse)
+
+    def _pulse(self):
+        """Move the progress bar.
+
+        This is executed with GLib's timeouts while pasting.
+        """
+        self._builder.get_object('progressbar').pulse()
+        return True
 
-    def _on_timeout(self, pasting_thread):
-        """Move the progressbar or show a message.
+    def _on_pasting_done(self, results):
+        """Handle the result of pasting in the main thread later.
 
-        This is executed with GLib's timeouts because this needs to
-        access GTK+.
+        This is called in a paste queue's worker thread, and GTK+ must
+        be used only in the main thread.
         """
-        if pasting_thread.is_alive():
-            # Move the progress bar and run this again.
-            self._builder.get_object('progressbar').pulse()
-            return True
-
-        if pasting_thread.success:
-            for func in self._postpaste_funcs:
-                func(pasting_thread.response)
+        GLib.idle_add(self._on_pasted, results)
+
+    def _on_pasted(self, results):
+        """Stop the progress bar and show a message."""
+        self._pasting = False
+        GLib.source_remove(self._pulse_source)
+        self._builder.get_object('progressbar').set_fraction(0)
+        self._update_pastebin_labels()
+
+        urls = [(pastebin.name, response)
+                for pastebin, success, response in results if success]
+        if len(results) == 1:
+            messages = [response for pastebin, success, response in results]
+        else:
+            messages = ['{}: {}'.format(pastebin.name, response)
+                        for pastebin, success, response in results]
+        for pastebin, success, response in results:
+            if success and pastebin not in self._requested_pastebins:
+                messages.append(
+                    _("{} was used because {} did not work.").format(
+                        pastebin.name, self._requested_pastebins[0].name))
+
+        if urls:
+            for name, url in urls:
+                for func in self._postpaste_funcs:
+                    func(url)
             dialog = Gtk.MessageDialog(
                 self._builder.get_object('window'), Gtk.DialogFlags.MODAL,
                 Gtk.MessageType.INFO, (
@@ -244,31 +673,107 @@ class NewPasteWindow:
                 ), _("Pasting succeeded."),
             )
             dialog.set_title(_("Success"))
-            dialog.format_secondary_text(pasting_thread.response)
-            response = dialog.run()
+            dialog.format_secondary_text('\n'.join(messages))
+            dialog_response = dialog.run()
             dialog.destroy()
-            if response == Gtk.ResponseType.YES:
-                webbrowser.open(pasting_thread.response)
-            self._destroy()
+            if dialog_response == Gtk.ResponseType.YES:
+                for name, url in urls:
+                    webbrowser.open(url)
+            self._close()
 
         else:
             dialog = Gtk.MessageDialog(
                 self._builder.get_object('window'), Gtk.DialogFlags.MODAL,
-                Gtk.MessageType.ERROR, Gtk.ButtonsType.OK,
-                _("Pasting failed!"),
+                Gtk.MessageType.ERROR, (
+                    _("Send later"), Gtk.ResponseType.APPLY,
+                    _("OK"), Gtk.ResponseType.OK,
+                ), _("Pasting failed!"),
             )
             dialog.set_title(_("Error"))
-            dialog.format_secondary_text(pasting_thread.response)
-            dialog.run()
+            dialog.format_secondary_text('\n'.join(messages))
+            dialog_response = dialog.run()
             dialog.destroy()
-            self._make_sensitive()
-
-    def _destroy(self, widget=None, event=None):
-        """Save some settings and destroy the window."""
+            if dialog_response == Gtk.ResponseType.APPLY:
+                # The outbox keeps trying until the pastes succeed. Only
+                # one paste is needed if the fastest paste would be kept.
+                group = self._paste_group
+                pastes = group.pastes
+                if group.policy == group.FIRST_SUCCESS:
+                    pastes = pastes[:1]
+                for pastebin, kwargs, failover in pastes:
+                    outbox.add(pastebin, kwargs, failover)
+                self._close()
+            else:
+                self._make_sensitive()
+
+        # Don't run this again.
+        return False
+
+    def _close(self, widget=None, event=None):
+        """Save some settings and hide the window.
+
+        The window is put back to the pool if there's room for it.
+        Otherwise it's destroyed.
+        """
         get = self._builder.get_object
 
         settings.set_string('General', 'username',
                             get('username-entry').get_text())
         settings.set_string('General', 'default_pastebin',
                             self._get_pastebin_name())
-        get('window').destroy()
+
+        # Don't guess the syntax of a closed window.
+        if self._detect_source is not None:
+            GLib.source_remove(self._detect_source)
+            self._detect_source = None
+        self._detect_number += 1
+        # Don't keep filling a hidden window with a file.
+        self._stop_loading()
+
+        # A window that is still pasting can't be reused because
+        # _on_pasted() will be called later.
+        if len(_pool) < _POOL_SIZE and not self._pasting:
+            get('window').hide()
+            _pool.append(self)
+        else:
+            get('window').destroy()
+
+        # Don't let GTK+ destroy the window on delete-event.
+        return True
+
+
+def _get_glade():
+    """Return the content of new-paste.glade as a string."""
+    global _glade
+    if _glade is None:
+        _glade = resource_string('pastetray', 'new-paste.glade')
+        _glade = _glade.decode('utf-8')
+    return _glade
+
+
+def prepare():
+    """Create a hidden window for get_window() if there's none.
+
+    Run this with GLib.idle_add() so the window is created when nothing
+    else is happening. Only the widgets are created, so this doesn't
+    load pastebins or connect to them.
+    """
+    if len(_pool) < _POOL_SIZE:
+        _pool.append(NewPasteWindow())
+    return False
+
+
+def get_window(postpaste_funcs=()):
+    """Return a new paste window that is ready to be shown.
+
+    The postpaste_funcs are used like in NewPasteWindow.reset().
+    Windows are reused, so this is fast.
+    """
+    if _pool:
+        window = _pool.pop()
+    else:
+        window = NewPasteWindow()
+    window.reset(postpaste_funcs)
+    # Get the next window ready.
+    GLib.idle_add(prepare)
+    return window
@@ -0,0 +1,320 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Pastes that could not be sent yet.
+
+The outbox is saved to an append-only journal file, so the pastes are
+not lost if PasteTray is closed or it crashes. A background thread
+tries to send them again every now and then.
+"""
+
+import base64
+import collections
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import traceback
+import uuid
+import zlib
+
+from pastetray import backend, filepaths, sources
+
+# Everything in listeners is called without arguments when a paste is
+# added to the outbox or removed from it. They may be called in a
+# background thread, so they must not use GTK+ directly. Pastes that are
+# sent are added to the history by backend.PasteGroup.
+listeners = []
+
+_JOURNAL_PATH = os.path.join(filepaths.user_cache_dir, 'outbox.journal')
+
+# The delays between attempts are in seconds. The delay starts at
+# _DELAY_MIN and doubles after each failure.
+_DELAY_MIN = 30
+_DELAY_MAX = 30 * 60
+
+_pending = collections.OrderedDict()    # id: entry
+_storing = 0        # The number of pastes that add() is still saving.
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_thread = None
+
+
+def _compress(content):
+    """Compress a sources.ContentSource to a base64 string."""
+    compressor = zlib.compressobj()
+    data = [compressor.compress(chunk) for chunk in content.chunks()]
+    data.append(compressor.flush())
+    return base64.b64encode(b''.join(data)).decode('ascii')
+
+
+def _decompress(string):
+    """Convert a string from _compress() back to text."""
+    return zlib.decompress(base64.b64decode(string)).decode('utf-8')
+
+
+def _append(record):
+    """Add a record to the journal file.
+
+    The lock must be acquired when this is called.
+    """
+    with open(_JOURNAL_PATH, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_journal():
+    """Return a list of records in the journal file."""
+    records = []
+    try:
+        with open(_JOURNAL_PATH, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # PasteTray was probably killed when it was writing
+                    # this line.
+                    pass
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _compact():
+    """Rewrite the journal without the pastes that are done.
+
+    The lock must be acquired when this is called.
+    """
+    temp_path = _JOURNAL_PATH + '.tmp'
+    with open(temp_path, 'w') as f:
+        for entry in _pending.values():
+            f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, _JOURNAL_PATH)
+
+
+def load():
+    """Read the journal and start sending pending pastes."""
+    with _lock:
+        _pending.clear()
+        records = _read_journal()
+        for record in records:
+            if record['op'] == 'add':
+                _pending[record['id']] = record
+            elif record['op'] == 'done':
+                _pending.pop(record['id'], None)
+        if len(records) != len(_pending):
+            _compact()
+    if _pending:
+        _start_thread()
+        # The network may work now.
+        wake()
+
+
+def add(pastebin, kwargs, failover=()):
+    """Add a paste to the outbox.
+
+    The kwargs should be a pastebin.paste_args dictionary with a
+    sources.ContentSource as the content. The failover pastebins are
+    used like with backend.PasteGroup. The content is compressed and
+    saved to the journal in a new thread, and PasteTray doesn't exit
+    before that's done.
+    """
+    global _storing
+    content = kwargs['content']
+    link = None
+    if content.path is not None:
+        # The file may be a temporary file that the new paste window
+        # removes, so the thread reads it through a link of its own.
+        fd, link = tempfile.mkstemp(suffix='.txt', dir=filepaths.temp_dir)
+        os.close(fd)
+        os.remove(link)
+        try:
+            os.link(content.path, link)
+        except OSError:
+            shutil.copyfile(content.path, link)
+        content = sources.ContentSource(path=link)
+
+    with _lock:
+        _storing += 1
+    thread = threading.Thread(target=_store,
+                              args=[pastebin, kwargs, content, failover,
+                                    link])
+    thread.start()
+    _notify_listeners()
+
+
+def _store(pastebin, kwargs, content, failover, link):
+    """Save a paste from add() to the journal."""
+    global _storing
+    counted = True
+    try:
+        entry = {
+            'op': 'add',
+            'id': uuid.uuid4().hex,
+            'pastebin': pastebin.name,
+            'failover': [target.name for target in failover],
+            'args': {key: value for key, value in kwargs.items()
+                     if key != 'content'},
+            'content': _compress(content),
+        }
+        with _lock:
+            # count() must not see the paste twice.
+            _storing -= 1
+            counted = False
+            _append(entry)
+            _pending[entry['id']] = entry
+    except Exception:
+        print("Cannot save a paste to the outbox:", file=sys.stderr)
+        traceback.print_exc()
+    finally:
+        if counted:
+            with _lock:
+                _storing -= 1
+        if link is not None:
+            os.remove(link)
+    _start_thread()
+    _notify_listeners()
+
+
+def count():
+    """Return the number of pastes in the outbox."""
+    with _lock:
+        return len(_pending) + _storing
+
+
+def wake():
+    """Try to send the pending pastes now.
+
+    Call this when it's likely that the network works again, e.g. when
+    some other paste succeeded.
+    """
+    _wakeup.set()
+
+
+def _notify_listeners():
+    for listener in listeners:
+        listener()
+
+
+def _start_thread():
+    """Start the thread that sends the pastes if it's not running."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_flush_forever)
+            _thread.daemon = True
+            _thread.start()
+
+
+def _send(entry):
+    """Paste an entry and return (success, response)."""
+    try:
+        pastebin = backend.pastebins[entry['pastebin']]
+    except KeyError:
+        # The pastebin script has been removed.
+        return (None, None)
+
+    failover = [backend.pastebins[name] for name in entry['failover']
+                if name in backend.pastebins]
+    kwargs = dict(entry['args'])
+    kwargs['content'] = sources.ContentSource(_decompress(entry['content']))
+    result = []
+    done = threading.Event()
+
+    def callback(results):
+        used_pastebin, success, response = results[0]
+        result.extend([success, response])
+        done.set()
+
+    # The paste queue takes care of retries and limits.
+    backend.PasteGroup(backend.paste_queue, [(pastebin, kwargs, failover)],
+                       backend.PasteGroup.FIRST_SUCCESS, callback)
+    done.wait()
+    return tuple(result)
+
+
+def _send_pending():
+    """Try to send the pending pastes once.
+
+    This returns False if the network doesn't seem to work and None if
+    there's nothing to send.
+    """
+    with _lock:
+        entries = list(_pending.values())
+    if not entries:
+        return None
+
+    for entry in entries:
+        success, response = _send(entry)
+        if success is False:
+            # The network probably doesn't work yet, so there's no
+            # point in trying the other pastes now.
+            return False
+        with _lock:
+            del _pending[entry['id']]
+            if _pending:
+                _append({'op': 'done', 'id': entry['id']})
+            else:
+                # Start a new, empty journal.
+                _compact()
+        _notify_listeners()
+    return True
+
+
+def _flush_forever():
+    """Send pending pastes until the outbox is empty."""
+    global _thread
+    delay = _DELAY_MIN
+    try:
+        while True:
+            _wakeup.wait(delay * random.uniform(0.5, 1.5))
+            _wakeup.clear()
+
+            try:
+                result = _send_pending()
+            except Exception:
+                print("Sending the outbox failed:", file=sys.stderr)
+                traceback.print_exc()
+                result = False
+
+            if result is None:
+                with _lock:
+                    if not _pending:
+                        # add() will start a new thread when it's
+                        # needed.
+                        _thread = None
+                        return
+            elif result:
+                delay = _DELAY_MIN
+            else:
+                delay = min(delay * 2, _DELAY_MAX)
+    finally:
+        # If this thread died because of an error, add() must be able
+        # to start a new thread.
+        with _lock:
+            if _thread is threading.current_thread():
+                _thread = None
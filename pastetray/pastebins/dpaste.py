@@ -21,127 +21,26 @@
 
 """This is a dpaste file for PasteTray."""
 
-import requests
-from pastetray import USER_AGENT
+from pastetray import connections, syntaxes
 
 name = 'dpaste'
 url = 'http://dpaste.com/'
 expiry_days = [1, 7, 30, 365]
 syntax_default = 'Plain text'
-syntax_choices = {
-    # This was generated with scripts/syntax_getters/dpaste.py in the
-    # PasteTray source package.
-    "RHTML": "rhtml",
-    "Io": "io",
-    "Myghty": "myghty",
-    "Haskell": "haskell",
-    "nginx config": "nginx",
-    "Debian sourcelist": "sourceslist",
-    "MoinMoin/Trac wiki markup": "trac-wiki",
-    "SQL": "sql",
-    "Sass": "sass",
-    "DTD": "dtd",
-    "Puppet": "puppet",
-    "Lighttpd config": "lighty",
-    "AppleScript": "applescript",
-    "Bash": "bash",
-    "Swift": "swift",
-    "Fortran": "fortran",
-    "INI": "ini",
-    "Python 2": "python",
-    "Bash session": "console",
-    "Ruby": "rb",
-    "SPARQL": "sparql",
-    "HTML + Django/Jinja template": "html+django",
-    "Ruby irb session": "rbcon",
-    "C": "c",
-    "Awk": "awk",
-    "Java": "java",
-    "HTML": "html",
-    "CSS": "css",
-    "Scheme": "scheme",
-    "JavaScript": "js",
-    "APL": "apl",
-    "Smarty template": "smarty",
-    "Batchfile": "bat",
-    "Modula-2": "modula2",
-    "C++": "cpp",
-    "Go": "go",
-    "Python console session": "pycon",
-    "Delphi": "delphi",
-    "JSON": "json",
-    "XML": "xml",
-    "IRC logs": "irc",
-    "Groovy": "groovy",
-    "Dylan": "dylan",
-    "Tcl": "tcl",
-    "Apache config": "apacheconf",
-    "Common Lisp": "common-lisp",
-    "JavaScript + Django/Jinja template": "js+django",
-    "Groff": "groff",
-    "ActionScript": "as",
-    "Mathematica": "mathematica",
-    "ERB": "erb",
-    "Ragel": "ragel",
-    "JavaServer pages": "jsp",
-    "PostScript": "postscript",
-    "Genshi": "genshi",
-    "Darcs patch": "dpatch",
-    "Prolog": "prolog",
-    "PowerShell": "powershell",
-    "PHP": "php",
-    "Haml": "haml",
-    "Erlang": "erlang",
-    "Perl 6": "perl6",
-    "Python 3 traceback": "py3tb",
-    "Smalltalk": "smalltalk",
-    "JavaScript + PHP": "js+php",
-    "Python 3": "python3",
-    "Shell session": "shell-session",
-    "C#": "csharp",
-    "Perl": "perl",
-    "SCSS": "scss",
-    "Ada": "ada",
-    "text + Django/Jinja template": "django",
-    "COBOL": "cobol",
-    "VB.net": "vb.net",
-    "Lasso": "lasso",
-    "Mako": "mako",
-    "Scala": "scala",
-    "YAML": "yaml",
-    "FSharp": "fsharp",
-    "LLVM": "llvm",
-    "Makefile": "make",
-    "Matlab": "matlab",
-    "Coldfusion HTML": "cfm",
-    "XSLT": "xslt",
-    "Lua": "lua",
-    "Eiffel": "eiffel",
-    "BBCode": "bbcode",
-    "HTML + PHP": "html+php",
-    "Rust": "rust",
-    "Dart": "dart",
-    "FoxPro": "Clipper",
-    "Diff": "diff",
-    "TeX": "tex",
-    "Python 2 traceback": "pytb",
-    "JavaScript + Ruby": "js+erb",
-    "reStructuredText": "rst",
-    "Plain text": "text",
-    "Factor": "factor",
-    "CoffeeScript": "coffee-script",
-    "Clojure": "clojure",
-    "OCaml": "ocaml",
-    "Objective-C": "objective-c",
-    "D": "d"
-}
+syntax_choices = syntaxes.Choices('dpaste')
+syntax_choices_url = 'http://dpaste.com/api/v2/syntax-choices/'
 
 paste_args = ['content', 'expiry', 'syntax', 'title', 'username']
 
 
+def prewarm():
+    """Connect to dpaste.com before pasting."""
+    connections.prewarm('http://dpaste.com/api/v2/')
+
+
 def paste(content, expiry, syntax, title, username):
     """Make a paste to dpaste.com."""
-    response = requests.post(
+    response = connections.session().post(
         'http://dpaste.com/api/v2/',
         data={
             'content': content,
@@ -150,7 +49,11 @@ def paste(content, expiry, syntax, title, username):
             'poster': username,
             'expiry_days': expiry,
         },
-        headers={'User-Agent': USER_AGENT},
     )
     response.raise_for_status()
     return response.text.strip()
+
+
+def parse_syntax_choices(response):
+    """Convert a response from syntax_choices_url to syntax_choices."""
+    return {name: syntax_id for syntax_id, name in response.json().items()}
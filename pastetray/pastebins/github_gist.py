@@ -27,7 +27,7 @@ The API documentation is here:
 
 import json
 
-import requests
+from pastetray import connections
 
 name = 'GitHub Gist'
 url = 'https://gist.github.com/'
@@ -36,9 +36,14 @@ expiry_days = [-1]
 paste_args = ['content', 'title']
 
 
+def prewarm():
+    """Connect to GitHub before pasting."""
+    connections.prewarm('https://api.github.com/')
+
+
 def paste(content, title):
     """Make a paste to GitHub Gist."""
-    response = requests.post(
+    response = connections.session().post(
         'https://api.github.com/gists',
         data=json.dumps({
             'description': title,
@@ -26,18 +26,25 @@ making the original pasting script. This file is my (Akuli's) version of
 it.
 """
 
-import requests
+from pastetray import connections
 
 name = 'hastebin'
 url = 'http://hastebin.com/'
 expiry_days = [30]
 
 paste_args = ['content']
+content_streaming = True
+
+
+def prewarm():
+    """Connect to hastebin.com before pasting."""
+    connections.prewarm('http://hastebin.com/')
 
 
 def paste(content):
     """Make a paste to hastebin.com."""
-    response = requests.post('http://hastebin.com/documents/',
-                             data=content.encode('utf-8'))
+    # The content is a file-like object, so requests sends it in chunks.
+    response = connections.session().post(
+        'http://hastebin.com/documents/', data=content)
     response.raise_for_status()
     return 'http://hastebin.com/' + response.json()['key']
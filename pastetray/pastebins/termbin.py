@@ -21,19 +21,106 @@
 
 """This is a termbin.com file for PasteTray."""
 
+import mmap
+import os
 import socket
+import threading
+import time
+
+from pastetray import connections
 
 name = 'termbin.com'
 url = 'http://termbin.com/'
 expiry_days = [30]
 
 paste_args = ['content']
+content_streaming = True
+
+_ADDRESS = ('termbin.com', 9999)
+
+# termbin.com treats an idle connection as the end of the paste, so
+# prewarm() can't leave a connection open. Instead, it looks up the
+# address and paste() uses the result if it's recent enough.
+_resolved = None        # (time, sockaddr) or None
+_resolved_lock = threading.Lock()
+_RESOLVED_MAX_AGE = 5 * 60
+
+
+def prewarm():
+    """Look up termbin.com's address before pasting."""
+    global _resolved
+    try:
+        info = socket.getaddrinfo(*_ADDRESS, type=socket.SOCK_STREAM)
+    except OSError:
+        return
+    with _resolved_lock:
+        _resolved = (time.monotonic(), info[0])
+
+
+def _connect():
+    """Return a socket connected to termbin.com."""
+    connect_timeout, read_timeout = connections.timeouts()
+    with _resolved_lock:
+        resolved = _resolved
+
+    sock = None
+    if resolved is not None:
+        when, (family, type_, proto, canonname, sockaddr) = resolved
+        if time.monotonic() - when < _RESOLVED_MAX_AGE:
+            sock = socket.socket(family, type_, proto)
+            sock.settimeout(connect_timeout)
+            try:
+                sock.connect(sockaddr)
+            except OSError:
+                # The address may have changed.
+                sock.close()
+                sock = None
+    if sock is None:
+        sock = socket.create_connection(_ADDRESS, connect_timeout)
+    sock.settimeout(read_timeout)
+    return sock
+
+
+def _send_file(sock, path):
+    """Send a file's content without reading it all to memory."""
+    with open(path, 'rb') as f:
+        if hasattr(os, 'sendfile'):
+            # The kernel copies the file directly to the socket.
+            sock.sendfile(f)
+            return
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mmapped.
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            sock.sendall(memoryview(mapped))
+
+
+def _receive_url(sock):
+    """Read the response until termbin.com closes the connection."""
+    chunks = []
+    while True:
+        chunk = sock.recv(1024)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8').strip('\0 \r\n')
+
+
+def paste_file(path):
+    """Paste a UTF-8 encoded file to termbin.com."""
+    with _connect() as sock:
+        _send_file(sock, path)
+        # termbin.com responds when it knows that the content ended.
+        sock.shutdown(socket.SHUT_WR)
+        return _receive_url(sock)
 
 
 def paste(content):
     """Make a paste to termbin.com."""
-    sock = socket.socket()
-    sock.connect(('termbin.com', 9999))
-    sock.send(content.encode('utf-8'))
-    url = sock.recv(1024)
-    return url.decode('utf-8').strip()
+    if content.path is not None:
+        return paste_file(content.path)
+    with _connect() as sock:
+        for chunk in content.chunks():
+            sock.sendall(chunk)
+        sock.shutdown(socket.SHUT_WR)
+        return _receive_url(sock)
@@ -0,0 +1,77 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Measure how long different parts of PasteTray's startup take.
+
+The phases are always timed because it's cheap, but they are displayed
+only with the --profile-startup option.
+"""
+
+import collections
+import contextlib
+import json
+import sys
+import time
+
+phases = collections.OrderedDict()    # These are name: seconds pairs.
+
+
+def add(name, seconds):
+    """Add seconds to a phase's time."""
+    phases[name] = phases.get(name, 0) + seconds
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Measure how long the with statement takes as a phase."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
+
+
+def report(file=sys.stdout):
+    """Print the phases, slowest first."""
+    if not phases:
+        print("No startup phases were timed.", file=file)
+        return
+    width = max(map(len, phases))
+    total = sum(phases.values())
+    for name, seconds in sorted(phases.items(), key=lambda item: -item[1]):
+        percent = 100 * seconds / total if total else 0
+        print("{:<{}}  {:8.1f} ms  {:5.1f} %".format(
+            name, width, seconds * 1000, percent), file=file)
+    print("{:<{}}  {:8.1f} ms".format("Total", width, total * 1000),
+          file=file)
+
+
+def save(path):
+    """Write the phases to a JSON file.
+
+    The times are in milliseconds.
+    """
+    data = collections.OrderedDict(
+        (name, round(seconds * 1000, 3)) for name, seconds in phases.items()
+    )
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.write('\n')
@@ -28,7 +28,7 @@ with Python's setuptools would be difficult.
 import configparser
 import os
 
-from gi.repository import Gtk, Gdk, Pango
+from gi.repository import Gtk, Gdk, GLib, Pango
 from pkg_resources import resource_string
 
 from pastetray import _, filepaths
@@ -36,6 +36,10 @@ from pastetray import _, filepaths
 
 _USER_CONFIG = os.path.join(filepaths.user_config_dir, 'pastetray.conf')
 
+# Changed settings are saved after this many milliseconds. Saving isn't
+# done right away because some settings change on every keystroke.
+_SAVE_DELAY = 1000
+
 
 class _ConfigParser(configparser.ConfigParser):
     """Configuration file parser with more features.
@@ -43,28 +47,55 @@ class _ConfigParser(configparser.ConfigParser):
     This is a separate class because configparser.ConfigParser doesn't
     take a converters keyword argument in Python versions older than
     3.5, and the converters keyword argument doesn't make setters.
+
+    The getters cache the converted values, so don't modify the objects
+    that they return. Everything in the listeners list is called with
+    the section and the key as arguments when a setter changes a value.
     """
 
     def __init__(self, **kwargs):
         types = kwargs.pop('types', [])
         configparser.ConfigParser.__init__(self, **kwargs)
+        self.listeners = []
+        self._cache = {}    # These are (type, section, key): value pairs.
+        self._type_names = [name for name, setter, getter in types]
         for name, setter, getter in types:
             self._add_setter(name, setter)
             self._add_getter(name, getter)
 
+    def clear_cache(self):
+        """Forget the converted values.
+
+        Call this after changing the settings without the setters.
+        """
+        self._cache.clear()
+
     def _add_setter(self, name, converter):
         def setter(section, key, value):
-            self[section][key] = str(converter(value))
+            string = str(converter(value))
+            if self.get(section, key, fallback=None) == string:
+                return
+            self[section][key] = string
+            for type_name in self._type_names:
+                self._cache.pop((type_name, section, key), None)
+            for listener in self.listeners:
+                listener(section, key)
         setattr(self, 'set_' + name, setter)
 
     def _add_getter(self, name, converter):
         def getter(section, key, **kwargs):
             try:
-                return converter(self[section][key])
+                return self._cache[(name, section, key)]
+            except KeyError:
+                pass
+            try:
+                value = converter(self[section][key])
             except KeyError as e:
                 if 'fallback' in kwargs.keys():
                     return kwargs['fallback']
                 raise e
+            self._cache[(name, section, key)] = value
+            return value
         setattr(self, 'get_' + name, getter)
 
 
@@ -100,18 +131,51 @@ settings = _ConfigParser(
 )
 
 
+_save_source = None
+
+
 def load():
     """Load configuration files."""
     defaults = resource_string('pastetray', 'default-settings.conf')
     settings.read_string(defaults.decode('utf-8'))
     settings.read([_USER_CONFIG])
+    settings.clear_cache()
 
 
 def save():
-    """Save to the user-wide configuration files."""
-    with open(_USER_CONFIG, 'w') as f:
+    """Save to the user-wide configuration files.
+
+    The file is replaced atomically, so it's never left half-written.
+    """
+    global _save_source
+    if _save_source is not None:
+        GLib.source_remove(_save_source)
+        _save_source = None
+
+    temp_path = _USER_CONFIG + '.tmp'
+    with open(temp_path, 'w') as f:
         print("# Configuartion file for PasteTray.", file=f)
         settings.write(f)
+    os.replace(temp_path, _USER_CONFIG)
+
+
+def _save_later():
+    global _save_source
+    _save_source = None
+    save()
+    return False
+
+
+def _on_setting_changed(section, key):
+    """Save the settings soon.
+
+    Many changes in a row are saved with one write.
+    """
+    global _save_source
+    if _save_source is None:
+        _save_source = GLib.timeout_add(_SAVE_DELAY, _save_later)
+
+settings.listeners.append(_on_setting_changed)
 
 
 class _PairGrid(Gtk.Grid):
@@ -125,6 +189,7 @@ class _PairGrid(Gtk.Grid):
     def add_single(self, item):
         """Add item to the grid."""
         self.attach(item, 0, self._y, 2, 1)
+        self._y += 1
 
     def add_pair(self, label, item):
         """Add a label-item pair."""
@@ -163,6 +228,13 @@ class SettingDialog(Gtk.Dialog):
         button.connect('font-set', self._on_font_changed)
         grid.add_pair(_("Font"), button)
 
+        grid = self._make_grid_in_frame(_("Pasting"))
+
+        check = Gtk.CheckButton(_("If pasting fails, try other pastebins"))
+        check.set_active(settings.get_bool('General', 'failover'))
+        check.connect('toggled', self._on_failover_toggled)
+        grid.add_single(check)
+
         self.get_content_area().show_all()
 
     def _make_grid_in_frame(self, label):
@@ -183,3 +255,7 @@ class SettingDialog(Gtk.Dialog):
         """Change font."""
         settings.set_string('General', 'new_paste_font',
                             fontbutton.get_font_name())
+
+    def _on_failover_toggled(self, checkbutton):
+        """Enable or disable failover."""
+        settings.set_bool('General', 'failover', checkbutton.get_active())
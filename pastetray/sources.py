@@ -0,0 +1,231 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Content sources for pasting.
+
+Encoding a big paste to UTF-8 at once needs a lot of memory, so the
+content is given to pastebin scripts as a ContentSource that encodes it
+in small chunks.
+"""
+
+import bisect
+import copy
+import os
+import threading
+
+# This is in characters or bytes.
+CHUNK_SIZE = 64 * 1024
+
+
+class ContentSource:
+    """Text to paste as UTF-8 chunks.
+
+    Pastebin scripts that have content_streaming set to True get these
+    objects as their content argument, and other pastebin scripts get
+    the content as a string.
+
+    The source is also a binary file-like object with read() and tell()
+    methods and a length in bytes, so it can be used as a request body
+    with requests.
+    """
+
+    def __init__(self, text=None, path=None, pieces=None):
+        """Initialize the source.
+
+        Give either text as a string, pieces as a sequence of strings
+        that are joined together, e.g. from PieceList.snapshot(), or a
+        path to a UTF-8 encoded file.
+        """
+        if [text, path, pieces].count(None) != 2:
+            raise TypeError("specify exactly one of text, path and pieces")
+        if text is not None:
+            pieces = (text,)
+        self.path = path
+        self._pieces = pieces
+
+        # A cheap estimate of the size in bytes. This is exact for files
+        # and ASCII text. Use len() for the exact size.
+        if path is not None:
+            self.size = os.path.getsize(path)
+        else:
+            self.size = sum(map(len, pieces))
+
+        self._length = None
+        self._length_lock = threading.Lock()
+        self._reader = None
+        self._pending = b''
+        self._offset = 0
+        self._position = 0
+
+    def copy(self):
+        """Return a new source with the same content.
+
+        The content is not copied, but the new source has its own
+        read() position. The size is not computed again.
+        """
+        result = copy.copy(self)
+        result._length_lock = threading.Lock()
+        result.seek(0)
+        return result
+
+    def __len__(self):
+        # Encoding the text chunk by chunk is slow but it doesn't need
+        # much memory, and this is usually called in a worker thread.
+        with self._length_lock:
+            if self._length is None:
+                if self.path is not None:
+                    self._length = os.path.getsize(self.path)
+                else:
+                    self._length = sum(map(len, self.chunks()))
+            return self._length
+
+    def chunks(self, size=CHUNK_SIZE):
+        """Yield the content as UTF-8 encoded bytes objects."""
+        if self.path is not None:
+            with open(self.path, 'rb') as f:
+                while True:
+                    chunk = f.read(size)
+                    if not chunk:
+                        break
+                    yield chunk
+        else:
+            for piece in self._pieces:
+                for start in range(0, len(piece), size):
+                    yield piece[start:start+size].encode('utf-8')
+
+    def text(self):
+        """Return the whole content as a string."""
+        if self.path is not None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return f.read()
+        if len(self._pieces) == 1:
+            return self._pieces[0]
+        return ''.join(self._pieces)
+
+    def read(self, size=-1):
+        """Read at most size bytes, or everything if size is negative.
+
+        Use seek(0) to start reading from the beginning again.
+        """
+        if self._reader is None:
+            self._reader = self.chunks()
+
+        result = []
+        length = 0
+        while size < 0 or length < size:
+            if self._offset >= len(self._pending):
+                self._pending = next(self._reader, b'')
+                self._offset = 0
+                if not self._pending:
+                    break
+            end = len(self._pending)
+            if size >= 0:
+                end = min(end, self._offset + size - length)
+            result.append(self._pending[self._offset:end])
+            length += end - self._offset
+            self._offset = end
+
+        self._position += length
+        return b''.join(result)
+
+    def tell(self):
+        """Return the number of bytes read so far."""
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Go back to the beginning.
+
+        Seeking anywhere else is not supported.
+        """
+        if (offset, whence) != (0, os.SEEK_SET):
+            raise OSError("ContentSource can only seek to the beginning")
+        self._reader = None
+        self._pending = b''
+        self._offset = 0
+        self._position = 0
+        return 0
+
+
+class PieceList:
+    """A long string that is kept as a list of short strings.
+
+    Inserting and deleting copy only the pieces that change, and
+    snapshot() doesn't copy the text at all, so a copy of a text
+    buffer's content can be kept up to date and pasted cheaply.
+    """
+
+    def __init__(self):
+        """Initialize an empty piece list."""
+        self._pieces = []
+        self._starts = []       # The offset of each piece.
+
+    def __len__(self):
+        if not self._pieces:
+            return 0
+        return self._starts[-1] + len(self._pieces[-1])
+
+    def _find(self, offset):
+        """Return the index of the piece that contains an offset.
+
+        An offset at the end is in the last piece.
+        """
+        return max(bisect.bisect_right(self._starts, offset) - 1, 0)
+
+    def _replace(self, first, last, text):
+        """Replace the pieces from first to last with text."""
+        new = [text[start:start+CHUNK_SIZE]
+               for start in range(0, len(text), CHUNK_SIZE)]
+        self._pieces[first:last+1] = new
+        del self._starts[first:]
+        offset = 0
+        if first > 0:
+            offset = self._starts[-1] + len(self._pieces[first-1])
+        for piece in self._pieces[first:]:
+            self._starts.append(offset)
+            offset += len(piece)
+
+    def insert(self, offset, text):
+        """Insert text to an offset in characters."""
+        if not self._pieces:
+            self._replace(0, 0, text)
+            return
+        index = self._find(offset)
+        piece = self._pieces[index]
+        offset -= self._starts[index]
+        self._replace(index, index, piece[:offset] + text + piece[offset:])
+
+    def delete(self, start, end):
+        """Delete the characters between two offsets."""
+        if start >= end:
+            return
+        first = self._find(start)
+        last = self._find(end)
+        text = (self._pieces[first][:start - self._starts[first]] +
+                self._pieces[last][end - self._starts[last]:])
+        self._replace(first, last, text)
+
+    def snapshot(self):
+        """Return the pieces as a tuple of strings.
+
+        The tuple can be given to ContentSource, and it doesn't change
+        when the piece list changes.
+        """
+        return tuple(self._pieces)
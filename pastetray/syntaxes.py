@@ -0,0 +1,224 @@
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""The syntax highlighting choices of the bundled pastebins.
+
+The choices are in syntaxes.txt. It's generated with
+scripts/make_syntax_table.py and it has one line for each syntax ID
+with the names that each pastebin uses for it. The file is read when
+the choices are needed for the first time, not when the pastebins are
+imported.
+
+Pastebins also get new syntax choices every now and then, so refresh()
+downloads the choices and saves them to the cache directory. The saved
+choices are used instead of syntaxes.txt if they exist.
+"""
+
+import collections.abc
+import email.utils
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from pkg_resources import resource_string
+
+from pastetray import filepaths
+
+# The choices are downloaded at most once in this many seconds.
+REFRESH_INTERVAL = 7 * 24 * 60 * 60
+
+_CACHE_DIR = os.path.join(filepaths.user_cache_dir, 'syntaxes')
+
+# These are {pastebin: ({name: id}, {id: name})} like _load_table()'s
+# return value, or {pastebin: None} if nothing has been downloaded.
+_downloaded = {}
+_downloaded_lock = threading.Lock()
+
+
+def _make_tables(choices):
+    """Return ({name: id}, {id: name}) for a {name: id} dictionary."""
+    ids = {}
+    names_by_id = {}
+    for name, syntax_id in choices.items():
+        syntax_id = sys.intern(syntax_id)
+        ids[name] = syntax_id
+        names_by_id[syntax_id] = name
+    return (ids, names_by_id)
+
+
+def _cache_path(pastebin):
+    return os.path.join(_CACHE_DIR, pastebin + '.json')
+
+
+def _read_cache(pastebin):
+    """Return the saved information about a pastebin's choices."""
+    try:
+        with open(_cache_path(pastebin), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(pastebin, cache):
+    os.makedirs(_CACHE_DIR, exist_ok=True)
+    temp_path = _cache_path(pastebin) + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, _cache_path(pastebin))
+
+
+@functools.lru_cache()
+def _load_table():
+    """Return a {pastebin: ({name: id}, {id: name})} dictionary."""
+    lines = resource_string('pastetray', 'syntaxes.txt').decode('utf-8')
+    lines = [line for line in lines.splitlines()
+             if line and not line.startswith('#')]
+    pastebins = lines[0].split('\t')[1:]
+    result = {pastebin: ({}, {}) for pastebin in pastebins}
+    for line in lines[1:]:
+        syntax_id, *names = line.split('\t')
+        # All pastebins share the same ID strings.
+        syntax_id = sys.intern(syntax_id)
+        for pastebin, name in zip(pastebins, names):
+            if name:
+                ids, names_by_id = result[pastebin]
+                ids[name] = syntax_id
+                names_by_id[syntax_id] = name
+    return result
+
+
+class Choices(collections.abc.Mapping):
+    """A pastebin's syntax_choices from syntaxes.txt.
+
+    This is a read-only {name: id} mapping.
+    """
+
+    def __init__(self, pastebin):
+        """Initialize the choices.
+
+        The pastebin should be a column name in syntaxes.txt, like
+        'dpaste'.
+        """
+        self._pastebin = pastebin
+
+    def _tables(self):
+        try:
+            tables = _downloaded[self._pastebin]
+        except KeyError:
+            with _downloaded_lock:
+                if self._pastebin not in _downloaded:
+                    choices = _read_cache(self._pastebin).get('choices')
+                    _downloaded[self._pastebin] = (
+                        None if choices is None else _make_tables(choices))
+                tables = _downloaded[self._pastebin]
+        if tables is None:
+            return _load_table()[self._pastebin]
+        return tables
+
+    def __getitem__(self, name):
+        return self._tables()[0][name]
+
+    def __iter__(self):
+        return iter(self._tables()[0])
+
+    def __len__(self):
+        return len(self._tables()[0])
+
+    def __contains__(self, name):
+        return name in self._tables()[0]
+
+    def find_name(self, syntax_id):
+        """Return the name of a syntax ID or None."""
+        return self._tables()[1].get(syntax_id)
+
+
+def find_name(syntax_id, pastebin):
+    """Return the pastebin's syntax_choices key of a syntax ID or None.
+
+    This is fast for Choices objects, but pastebins that have a plain
+    dictionary as their syntax_choices work too.
+    """
+    if isinstance(pastebin.syntax_choices, Choices):
+        return pastebin.syntax_choices.find_name(syntax_id)
+    for name, value in pastebin.syntax_choices.items():
+        if value == syntax_id:
+            return name
+    return None
+
+
+def refresh(pastebin):
+    """Download new syntax choices for a pastebin if needed.
+
+    Pastebin scripts that use Choices can define a syntax_choices_url
+    and a parse_syntax_choices(response) function that returns a
+    {name: id} dictionary. The choices are downloaded with conditional
+    requests, so nothing is downloaded if they haven't changed.
+
+    This returns True if the choices changed. It blocks, so call this
+    in a background thread. requests exceptions are not caught.
+    """
+    choices = pastebin.syntax_choices
+    url = getattr(pastebin, 'syntax_choices_url', None)
+    if not isinstance(choices, Choices) or url is None:
+        return False
+
+    cache = _read_cache(choices._pastebin)
+    now = time.time()
+    if now - cache.get('checked', 0) < REFRESH_INTERVAL:
+        return False
+
+    # requests is slow to import, so this is not imported on startup.
+    from pastetray import connections
+
+    headers = {}
+    if 'etag' in cache:
+        headers['If-None-Match'] = cache['etag']
+    if 'last_modified' in cache:
+        headers['If-Modified-Since'] = cache['last_modified']
+    elif 'checked' in cache:
+        headers['If-Modified-Since'] = email.utils.formatdate(
+            cache['checked'], usegmt=True)
+    response = connections.session().get(url, headers=headers)
+
+    if response.status_code == 304:
+        cache['checked'] = now
+        _write_cache(choices._pastebin, cache)
+        return False
+    response.raise_for_status()
+
+    new_choices = pastebin.parse_syntax_choices(response)
+    if pastebin.syntax_default not in new_choices:
+        # Something is wrong with the list, so it's better to keep
+        # using the old choices.
+        return False
+    cache = {'checked': now, 'choices': new_choices}
+    if 'ETag' in response.headers:
+        cache['etag'] = response.headers['ETag']
+    if 'Last-Modified' in response.headers:
+        cache['last_modified'] = response.headers['Last-Modified']
+    _write_cache(choices._pastebin, cache)
+
+    with _downloaded_lock:
+        _downloaded[choices._pastebin] = _make_tables(new_choices)
+    return True
@@ -21,12 +21,99 @@
 
 """Handy utilities."""
 
+import bisect
 import contextlib
 import functools
+import itertools
 
 from gi.repository import Gtk
 
 
+# The completion popup doesn't show more than this many matches.
+_MAX_MATCHES = 100
+
+
+def _is_subsequence(key, text):
+    """Check if the characters of key are in text in the same order."""
+    chars = iter(text)
+    return all(char in chars for char in key)
+
+
+class CompletionIndex:
+    """A precomputed index for finding completions quickly.
+
+    All strings are casefolded, so the matching is case-insensitive.
+    """
+
+    def __init__(self, completions):
+        """Build the index."""
+        self.completions = list(completions)
+        self.exact = set(self.completions)
+        keys = [completion.casefold() for completion in self.completions]
+        self._keys = keys
+
+        # Every suffix of every key in alphabetical order, so substrings
+        # can be found with binary search. These are (suffix, start,
+        # index) tuples, where index is the completion's index.
+        self._suffixes = sorted(
+            (key[start:], start, index)
+            for index, key in enumerate(keys)
+            for start in range(len(key)))
+
+    def _rank(self, key, index, start):
+        """Return a sort key for a completion that contains key."""
+        text = self._keys[index]
+        if text == key:
+            rank = 0
+        elif start == 0:
+            rank = 1
+        elif not text[start-1].isalnum():
+            # The key is at the beginning of a word.
+            rank = 2
+        else:
+            rank = 3
+        return (rank, index)
+
+    def find(self, text, candidates=None):
+        """Return a list of completion indexes that match text, best first.
+
+        The completions that contain text are the best matches, and the
+        completions that contain text's characters in the same order are
+        the worst. If candidates is not None, only the completion indexes
+        in it are matched.
+        """
+        key = text.strip().casefold()
+        if not key:
+            result = range(len(self.completions))
+            if candidates is not None:
+                result = sorted(candidates)
+            return list(result)
+
+        ranks = {}
+        position = bisect.bisect_left(self._suffixes, (key,))
+        for suffix, start, index in itertools.islice(
+                self._suffixes, position, None):
+            if not suffix.startswith(key):
+                break
+            if candidates is not None and index not in candidates:
+                continue
+            rank = self._rank(key, index, start)
+            ranks[index] = min(rank, ranks.get(index, rank))
+
+        # Fuzzy matches.
+        if candidates is None:
+            candidates = range(len(self.completions))
+        for index in candidates:
+            if index not in ranks and _is_subsequence(key, self._keys[index]):
+                ranks[index] = (4, index)
+
+        return sorted(ranks, key=ranks.__getitem__)
+
+
+# Each pastebin's syntax choices are indexed only once.
+_get_index = functools.lru_cache(maxsize=16)(CompletionIndex)
+
+
 class EntryCompletion:
     """Simple entry autocompletion."""
 
@@ -41,8 +128,14 @@ class EntryCompletion:
         self._entry = entry
         self._image = image
         self._tooltip = invalid_choice_tooltip
+        self._index = _get_index(())
 
+        # The model contains only the best matches, so GTK+ doesn't need
+        # to check every completion.
         self._model = Gtk.ListStore(str)
+        self._shown = []        # The completion indexes in the model.
+        self._last_key = None
+        self._matches = None    # A set of completion indexes.
         self._completion = Gtk.EntryCompletion()
         self._completion.set_model(self._model)
         self._completion.set_text_column(0)
@@ -51,18 +144,59 @@ class EntryCompletion:
         self.on_entry_changed()
 
     def _match(self, completion, char, tree_iter):
-        """Check if the completion should be displayed."""
-        entry_text = self._entry.get_text()
-        match_text = self._model[tree_iter][0]
-        return entry_text.lower().strip() in match_text.lower()
+        """Check if the completion should be displayed.
+
+        Everything in the model is a match.
+        """
+        return True
+
+    def _update_model(self):
+        """Put the best matches of the entry's text to the model."""
+        key = self._entry.get_text().strip().casefold()
+        if key == self._last_key:
+            return
+
+        # Adding characters to the end of the text can only remove
+        # matches, so there's no need to check everything again.
+        if (self._matches is not None and self._last_key and
+                key.startswith(self._last_key)):
+            matches = self._index.find(key, self._matches)
+        else:
+            matches = self._index.find(key)
+        self._last_key = key
+        self._matches = set(matches)
+        shown = matches[:_MAX_MATCHES]
+        if shown == self._shown:
+            return
+
+        kept = set(shown)
+        if (self._shown is not None and
+                [index for index in self._shown if index in kept] == shown):
+            # Some of the old matches are still shown in the same
+            # order, so the others can be just removed.
+            tree_iter = self._model.get_iter_first()
+            for index in self._shown:
+                if index in kept:
+                    tree_iter = self._model.iter_next(tree_iter)
+                else:
+                    self._model.remove(tree_iter)
+        else:
+            # The completion doesn't need to react to each row.
+            self._completion.set_model(None)
+            self._model.clear()
+            for index in shown:
+                self._model.append([self._index.completions[index]])
+            self._completion.set_model(self._model)
+        self._shown = shown
 
     def on_entry_changed(self, widget=None):
         """Display a triangle if entry's text is not in completions.
 
         Connect the entry's changed signal to this.
         """
+        self._update_model()
         entry_text = self._entry.get_text()
-        if entry_text in (i[0] for i in self._model):
+        if entry_text in self._index.exact:
             self._image.clear()
             self._image.set_tooltip_text(None)
         else:
@@ -72,12 +206,23 @@ class EntryCompletion:
 
     def set_completions(self, completions):
         """Set the autocompletion list to complete from."""
-        self._model.clear()
-        for completion in completions:
-            self._model.append([completion])
+        self._index = _get_index(tuple(completions))
+        self._last_key = None
+        self._matches = None
+        # The model is refilled by on_entry_changed().
+        self._shown = None
         self.on_entry_changed()
 
 
+def format_size(size):
+    """Return a human-readable string of a number of bytes."""
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return "{:.0f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} GB".format(size)
+
+
 @contextlib.contextmanager
 def blocked(widget, function):
     """Block a GObject signal temporarily."""
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2016 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Make pastetray/syntaxes.txt with the scripts in syntax_getters.
+
+The syntax getters need requests and an internet connection.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+os.chdir(os.path.dirname(here))
+
+HEADER = '''\
+# This file was generated with scripts/make_syntax_table.py. Don't edit
+# it by hand.
+#
+# The first column is the syntax ID that is given to the pastebins, and
+# the other columns are the names that are displayed for each pastebin.
+# Empty names mean that the pastebin doesn't support the syntax.
+'''
+
+
+def get_choices(pastebin):
+    """Run a syntax getter and return a {name: id} dictionary."""
+    script = os.path.join(here, 'syntax_getters', pastebin + '.py')
+    output = subprocess.check_output([sys.executable, script])
+    return json.loads(output.decode('utf-8'))
+
+
+def write_table(choices, file):
+    """Write a table of {pastebin: {name: id}} dictionaries to file."""
+    pastebins = sorted(choices)
+    names = {}      # {id: {pastebin: name}}
+    for pastebin in pastebins:
+        # Sorting makes the output the same every time.
+        for name, syntax_id in sorted(choices[pastebin].items()):
+            if '\t' in name + syntax_id:
+                sys.exit("tab in syntax {!r} of {}".format(name, pastebin))
+            row = names.setdefault(syntax_id, {})
+            if pastebin in row:
+                print("{}: {!r} and {!r} are both {!r}, skipping {!r}"
+                      .format(pastebin, row[pastebin], name, syntax_id, name),
+                      file=sys.stderr)
+                continue
+            row[pastebin] = name
+
+    file.write(HEADER)
+    print('\t'.join(['id'] + pastebins), file=file)
+    for syntax_id, row in sorted(names.items()):
+        print('\t'.join([syntax_id] + [row.get(pastebin, '')
+                                       for pastebin in pastebins]),
+              file=file)
+
+
+def main():
+    choices = {}
+    for filename in sorted(os.listdir(os.path.join(here, 'syntax_getters'))):
+        if filename.endswith('.py'):
+            pastebin = filename[:-3]
+            print("Getting syntax choices of", pastebin)
+            choices[pastebin] = get_choices(pastebin)
+    with open(os.path.join('pastetray', 'syntaxes.txt'), 'w') as f:
+        write_table(choices, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -79,6 +79,7 @@ setup(
     install_requires=pastetray.PIP_DEPENDS,
     packages=['pastetray', 'pastetray.pastebins'],
     package_data={'pastetray': ['default_settings.conf', 'icons/*x*.png',
-                                '*.glade', 'locale/*.mo', 'doc/*']},
+                                '*.glade', 'syntaxes.txt', 'locale/*.mo',
+                                'doc/*']},
     entry_points={'gui_scripts': ['pastetray = pastetray.__main__:main']},
 )